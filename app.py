@@ -1,15 +1,15 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
+import os
+from importlib import import_module
 
-# Import modules for different functionalities
+# Import modules for different functionalities; the sections' modules are
+# imported when a section is first rendered, so the first paint does not wait
+# for matplotlib, seaborn and scipy
 from modules.data_input import data_input_sidebar
-from modules.measures_variability import measures_variability_tab
-from modules.visualization import visualization_tab
-from modules.all_stats import all_stats_tab
-from modules.measures_center import calculate_mean, calculate_median, calculate_mode, measures_center_tab
-from modules.about import show_about
-from modules.feedback import show_feedback
+from modules.stats_engine import describe
+from modules.profiling import finish_trace, start_trace
+from modules.performance import performance_panel, profiling_requested
+from modules.metrics import rerun_finished, rerun_started, section_label, start_metrics_server
 
 # Set page config
 st.set_page_config(
@@ -19,6 +19,16 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Prometheus endpoint beside the app when STATS_APP_METRICS_PORT is set; serve.py starts it with the
+# server, otherwise the first session does
+start_metrics_server()
+rerun_started()
+
+# Opt-in timing of this rerun: STATS_APP_PROFILE=1 for every session, ?profile=1 for one
+PROFILE = profiling_requested()
+if PROFILE:
+    start_trace()
+
 # Add custom CSS
 st.markdown("""
 <style>
@@ -55,26 +65,43 @@ Enter your data in the sidebar, then explore different tabs to see calculations
 # Sidebar for data input
 data = data_input_sidebar()
 
-# Main content with tabs
+# Main content: "lazy" renders only the selected section, "tabs" renders every tab on each rerun
+RENDER_MODE = os.environ.get("STATS_APP_RENDER_MODE", "lazy")
+
+SECTIONS = {
+    "📏 Measures of Center": lambda data, summary: import_module("modules.measures_center").measures_center_tab(data, summary),
+    "📊 Measures of Variability": lambda data, summary: import_module("modules.measures_variability").measures_variability_tab(data, summary),
+    "📈 Visualization": lambda data, summary: import_module("modules.visualization").visualization_tab(data, summary),
+    "🧮 All Statistics": lambda data, summary: import_module("modules.all_stats").all_stats_tab(data, summary),
+    " About": lambda data, summary: import_module("modules.about").show_about(),
+    " Feedback": lambda data, summary: import_module("modules.feedback").show_feedback(),
+}
+
+metrics_section = "none"
 if data is not None and len(data) > 0:
-    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["📏 Measures of Center", "📊 Measures of Variability", "📈 Visualization", "🧮 All Statistics", " About", " Feedback"])
-    
-    with tab1:
-        measures_center_tab(data)
+    # Compute the statistics once and share them across every tab
+    summary = describe(data)
     
-    with tab2:
-        measures_variability_tab(data)
-    
-    with tab3:
-        visualization_tab(data)
-    
-    with tab4:
-        all_stats_tab(data)
-        
-    with tab5:
-       show_about()
-            
-    with tab6:
-       show_feedback()
+    if RENDER_MODE == "tabs":
+        metrics_section = "all"
+        for tab, render in zip(st.tabs(list(SECTIONS)), SECTIONS.values()):
+            with tab:
+                render(data, summary)
+    else:
+        # Only the selected section runs, so unvisited sections cost nothing on a rerun
+        section = st.radio(
+            "Section",
+            list(SECTIONS),
+            horizontal=True,
+            label_visibility="collapsed",
+            key="active_section"
+        )
+        metrics_section = section_label(section)
+        SECTIONS[section](data, summary)
 else:
     st.info("👈 Please enter your data in the sidebar to get started.")
+
+if PROFILE:
+    performance_panel(finish_trace())
+
+rerun_finished(metrics_section, len(data) if data is not None else 0)
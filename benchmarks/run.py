@@ -0,0 +1,167 @@
+"""Run the benchmark suite, append the timings to a history file and flag regressions.
+
+Usage: python -m benchmarks.run [--sizes 10 1000 ...] [--filter plot_] [--threshold 0.2] [--no-save]
+
+Each benchmark runs on every distribution and size at least --min-repeats
+times, and keeps repeating until --budget seconds are spent or --max-repeats is
+reached; the median is reported. A timing is flagged as a regression when it is
+more than --threshold slower than the median of the last --baseline-runs runs
+recorded for the same machine (and at least --noise-ms slower). Exits with
+status 1 if anything regressed.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from modules.cache import IMAGE_CACHE, RESULT_CACHE
+from benchmarks.suite import BENCHMARKS, DISTRIBUTIONS, SIZES, fresh_summary, make_dataset
+
+HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "history.jsonl")
+
+
+def time_once(bench, data, summary):
+    """Seconds taken by one call, with empty caches and the garbage collector paused"""
+    RESULT_CACHE.clear()
+    IMAGE_CACHE.clear()
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        bench(data, summary)
+        return time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def measure(bench, data, min_repeats, max_repeats, budget, needs_summary=True):
+    """Timings of repeated calls, each on a fresh summary, after one untimed warm-up call"""
+    # Plotting libraries are imported on first use; that one-off cost is not the function's
+    time_once(bench, data, fresh_summary(data) if needs_summary else None)
+    timings = []
+    while len(timings) < max_repeats and (len(timings) < min_repeats or sum(timings) < budget):
+        summary = fresh_summary(data) if needs_summary else None
+        timings.append(time_once(bench, data, summary))
+    return timings
+
+
+def machine_info():
+    return {
+        "node": platform.node(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+    }
+
+
+def git_commit():
+    """Current commit and whether the tree has uncommitted changes, or (None, None) outside git"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=root, capture_output=True, text=True, check=True)
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit.stdout.strip(), bool(status.stdout.strip())
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def baselines(history, machine, runs):
+    """Median of each benchmark's medians over the last runs recorded on this machine"""
+    same = [run for run in history if run["machine"] == machine][-runs:]
+    medians = {}
+    for run in same:
+        for key, result in run["results"].items():
+            medians.setdefault(key, []).append(result["median"])
+    return {key: float(np.median(values)) for key, values in medians.items()}
+
+
+def result_key(name, distribution, n):
+    return f"{name}[{distribution},{n}]"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--distributions", nargs="+", choices=list(DISTRIBUTIONS), default=list(DISTRIBUTIONS))
+    parser.add_argument("--filter", default="", help="only benchmarks whose name contains this text")
+    parser.add_argument("--min-repeats", type=int, default=3)
+    parser.add_argument("--max-repeats", type=int, default=50)
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds spent repeating one benchmark")
+    parser.add_argument("--history", default=HISTORY, help="JSON-lines file of past runs")
+    parser.add_argument("--baseline-runs", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative slowdown flagged as a regression")
+    parser.add_argument("--noise-ms", type=float, default=0.5, help="slowdowns below this are never flagged")
+    parser.add_argument("--no-save", action="store_true", help="compare without appending this run to the history")
+    args = parser.parse_args(argv)
+
+    machine = machine_info()
+    history = load_history(args.history)
+    baseline = baselines(history, machine, args.baseline_runs)
+    names = [name for name in BENCHMARKS if args.filter in name]
+
+    results = {}
+    regressions = []
+    print(f"{'benchmark':<60} {'median':>11} {'baseline':>11} {'change':>8}")
+    for n in sorted(args.sizes):
+        for distribution in args.distributions:
+            data = make_dataset(distribution, n)
+            for name in names:
+                timings = measure(
+                    BENCHMARKS[name], data, args.min_repeats, args.max_repeats, args.budget,
+                    needs_summary=name != "describe",
+                )
+                key = result_key(name, distribution, n)
+                median = float(np.median(timings))
+                results[key] = {"median": median, "min": float(min(timings)), "repeats": len(timings)}
+
+                line = f"{key:<60} {median * 1000:9.3f}ms"
+                if key in baseline:
+                    previous = baseline[key]
+                    change = median / previous - 1
+                    line += f" {previous * 1000:9.3f}ms {change:+8.1%}"
+                    if change > args.threshold and (median - previous) * 1000 > args.noise_ms:
+                        regressions.append(key)
+                        line += "  REGRESSION"
+                print(line, flush=True)
+            del data
+
+    commit, dirty = git_commit()
+    if not args.no_save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+        record = {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": commit,
+            "dirty": dirty,
+            "machine": machine,
+            "results": results,
+        }
+        with open(args.history, "a") as f:
+            f.write(json.dumps(record) + "\n")
+        print(f"\nRecorded {len(results)} timings in {args.history}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}:")
+        for key in regressions:
+            print(f"  {key}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
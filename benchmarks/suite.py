@@ -0,0 +1,104 @@
+"""Benchmarked functions, dataset sizes and distributions.
+
+Each benchmark is timed on a fresh summary, so lazily computed parts (the sort,
+the frequency table, histogram counts) are paid for as on a new dataset, and the
+shared result caches are bypassed. Calculation steps are rendered to text, as
+they are when shown, and plots are encoded to PNG as show_plot does.
+"""
+import inspect
+
+import numpy as np
+
+from modules.stats_engine import describe
+from modules.explain import Explanation
+from modules.figures import render_png
+from modules.measures_center import calculate_mean, calculate_median, calculate_mode
+from modules.measures_variability import (
+    calculate_range, calculate_variance, calculate_std_dev, calculate_iqr, calculate_cv
+)
+from modules.all_stats import generate_five_number_summary, generate_descriptive_stats
+from modules.visualization import (
+    plot_histogram, plot_boxplot, plot_stem_and_leaf, plot_normal_probability, plot_compare_distribution
+)
+
+SIZES = (10, 1_000, 100_000, 10_000_000)
+
+# Seed of every generated dataset, so runs and machines time the same values
+SEED = 20240101
+
+
+def _continuous(rng, n):
+    return rng.normal(50.0, 10.0, n)
+
+
+def _integer_heavy(rng, n):
+    # Whole numbers over a wide range: few repeats, but every value is an integer
+    return rng.integers(0, 1_000_000, n).astype(np.float64)
+
+
+def _many_ties(rng, n):
+    # A handful of distinct values, as in rounded survey answers
+    return rng.binomial(9, 0.3, n).astype(np.float64)
+
+
+DISTRIBUTIONS = {
+    "continuous": _continuous,
+    "integer_heavy": _integer_heavy,
+    "many_ties": _many_ties,
+}
+
+
+def make_dataset(distribution, n):
+    """Seeded dataset of one distribution and size"""
+    return DISTRIBUTIONS[distribution](np.random.default_rng(SEED), n)
+
+
+def _uncached(func):
+    # Past the result cache and the profiling wrapper, to the function itself
+    return inspect.unwrap(func)
+
+
+def _render_steps(result):
+    # Explanations are built lazily; str() builds them as showing them would
+    for item in result if isinstance(result, tuple) else (result,):
+        if isinstance(item, Explanation):
+            str(item)
+    return result
+
+
+def _calculation(func, **kwargs):
+    func = _uncached(func)
+    return lambda data, summary: _render_steps(func(data, summary=summary, **kwargs))
+
+
+def _plot(func, **kwargs):
+    func = _uncached(func)
+    return lambda data, summary: render_png(func(data, summary=summary, **kwargs))
+
+
+_describe = _uncached(describe)
+
+# name -> function of (data, summary); "describe" times the summary itself and ignores the one passed in
+BENCHMARKS = {
+    "describe": lambda data, summary: _describe(data),
+    "calculate_mean": _calculation(calculate_mean),
+    "calculate_median": _calculation(calculate_median),
+    "calculate_mode": _calculation(calculate_mode),
+    "calculate_range": _calculation(calculate_range),
+    "calculate_variance": _calculation(calculate_variance),
+    "calculate_std_dev": _calculation(calculate_std_dev),
+    "calculate_iqr": _calculation(calculate_iqr),
+    "calculate_cv": _calculation(calculate_cv),
+    "generate_five_number_summary": _calculation(generate_five_number_summary),
+    "generate_descriptive_stats": _calculation(generate_descriptive_stats),
+    "plot_stem_and_leaf": _calculation(plot_stem_and_leaf),
+    "plot_histogram": _plot(plot_histogram),
+    "plot_boxplot": _plot(plot_boxplot),
+    "plot_normal_probability": _plot(plot_normal_probability),
+    "plot_compare_distribution": _plot(plot_compare_distribution),
+}
+
+
+def fresh_summary(data):
+    """Summary with none of its lazy parts computed yet"""
+    return _describe(data)
@@ -1,86 +1,73 @@
 import streamlit as st
-import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 
-from modules.measures_center import calculate_mean, calculate_median, calculate_mode
-from modules.measures_variability import (
-    calculate_range, calculate_variance, calculate_std_dev, 
-    calculate_iqr, calculate_cv
-)
+from modules.stats_engine import describe, format_value
+from modules.cache import cached
+from modules.figures import new_figure, show_figure, show_plot
+from modules.measures_center import calculate_mode
 from modules.visualization import plot_histogram, plot_boxplot
+from modules.profiling import timed
 
-def generate_five_number_summary(data):
+@timed("statistics")
+@cached
+def generate_five_number_summary(data, summary=None):
     """Generate the five-number summary for the dataset"""
-    sorted_data = sorted(data)
-    min_val = min(sorted_data)
-    max_val = max(sorted_data)
-    
-    # Calculate median
-    median_val, _ = calculate_median(data)
-    
-    # Calculate quartiles
-    iqr_val, _, q1, q3 = calculate_iqr(data)
+    if summary is None:
+        summary = describe(data)
     
     return {
-        "Minimum": min_val,
-        "Q1": q1,
-        "Median": median_val,
-        "Q3": q3,
-        "Maximum": max_val,
-        "IQR": iqr_val
+        "Minimum": summary.minimum,
+        "Q1": summary.q1,
+        "Median": summary.median,
+        "Q3": summary.q3,
+        "Maximum": summary.maximum,
+        "IQR": summary.iqr
     }
 
-def generate_descriptive_stats(data, is_population=False):
+@timed("statistics")
+@cached
+def generate_descriptive_stats(data, is_population=False, summary=None):
     """Generate comprehensive descriptive statistics for the dataset"""
-    n = len(data)
-    mean_val, _ = calculate_mean(data)
-    median_val, _ = calculate_median(data)
-    mode_vals, _, _ = calculate_mode(data)
+    if summary is None:
+        summary = describe(data)
     
+    # Memory-mapped data gets the bounded-memory heavy-hitter estimate
+    mode_vals, _, _ = calculate_mode(data, summary, top_k=1)
     if mode_vals:
-        mode_str = ", ".join([str(x) for x in sorted(mode_vals)])
+        mode_str = ", ".join([format_value(x) for x in mode_vals])
     else:
         mode_str = "No mode"
     
-    range_val, _ = calculate_range(data)
-    variance, _ = calculate_variance(data, is_population)
-    std_dev, _, _ = calculate_std_dev(data, is_population)
-    iqr_val, _, q1, q3 = calculate_iqr(data)
-    cv, _ = calculate_cv(data)
-    
-    # Additional statistics
-    skewness = pd.Series(data).skew()
-    kurtosis = pd.Series(data).kurtosis()
-    
     # Calculate percentiles
     percentiles = {
-        "10th": np.percentile(data, 10),
-        "25th": q1,
-        "50th": median_val,
-        "75th": q3,
-        "90th": np.percentile(data, 90)
+        "10th": summary.p10,
+        "25th": summary.q1,
+        "50th": summary.median,
+        "75th": summary.q3,
+        "90th": summary.p90
     }
     
     return {
-        "Count": n,
-        "Mean": mean_val,
-        "Median": median_val,
+        "Count": summary.n,
+        "Mean": summary.mean,
+        "Median": summary.median,
         "Mode": mode_str,
-        "Range": range_val,
-        "Variance": variance,
-        "Standard Deviation": std_dev,
-        "IQR": iqr_val,
-        "CV": f"{cv:.2f}%",
-        "Skewness": skewness,
-        "Kurtosis": kurtosis,
+        "Range": summary.range,
+        "Variance": summary.variance(is_population),
+        "Standard Deviation": summary.std_dev(is_population),
+        "IQR": summary.iqr,
+        "CV": f"{summary.cv:.2f}%",
+        "Skewness": summary.skewness,
+        "Kurtosis": summary.kurtosis,
         "Percentiles": percentiles,
-        "Min": min(data),
-        "Max": max(data),
-        "Q1": q1,
-        "Q3": q3,
-        "Is Population": is_population
+        "Min": summary.minimum,
+        "Max": summary.maximum,
+        "Q1": summary.q1,
+        "Q3": summary.q3,
+        "Is Population": is_population,
+        "Sketch Percentiles": summary.sketch_quantiles,
+        "Sketch Rank Error": summary.sketch.rank_error if summary.sketch is not None else None,
+        "Exact Quantiles": summary.exact_quantiles
     }
 
 def create_summary_dataframe(stats):
@@ -126,6 +113,14 @@ def create_summary_dataframe(stats):
         ]
     }
     
+    # Show the sketch estimates beside the (n+1)p values when a sketch was built
+    sketch = stats.get("Sketch Percentiles")
+    if sketch is not None:
+        sketch_values = [sketch["p10"], sketch["q1"], sketch["median"], sketch["q3"], sketch["p90"], sketch["q3"] - sketch["q1"]]
+        quartile_stats[f"KLL Sketch (±{stats['Sketch Rank Error']:.2%} rank)"] = sketch_values
+        if not stats["Exact Quantiles"]:
+            quartile_stats["Value"] = sketch_values
+    
     # Shape statistics
     shape_stats = {
         "Statistic": ["Skewness", "Kurtosis"],
@@ -139,7 +134,8 @@ def create_summary_dataframe(stats):
     
     return basic_df, quartile_df, shape_df
 
-def all_stats_tab(data):
+@timed("section")
+def all_stats_tab(data, summary):
     """Display the all statistics tab content"""
     st.header("🧮 All Statistics")
     st.write("View a comprehensive summary of all statistical measures for your dataset.")
@@ -150,7 +146,7 @@ def all_stats_tab(data):
     with col1:
         # Calculate all statistics
         is_population = st.checkbox("Treat as population data", key="all_stats_population")
-        stats = generate_descriptive_stats(data, is_population)
+        stats = generate_descriptive_stats(data, is_population, summary)
         
         # Create and display summary tables
         basic_df, quartile_df, shape_df = create_summary_dataframe(stats)
@@ -211,22 +207,20 @@ def all_stats_tab(data):
         
         # Histogram
         st.write("**Histogram**")
-        hist_fig = plot_histogram(data, bins='auto', kde=True)
-        st.pyplot(hist_fig)
+        show_plot(plot_histogram, data, bins='auto', kde=True, summary=summary)
         
         # Box Plot
         st.write("**Box Plot**")
-        box_fig = plot_boxplot(data)
-        st.pyplot(box_fig)
+        show_plot(plot_boxplot, data, summary=summary)
         
         # Five number summary visualization
         st.write("**Five-Number Summary**")
         
         # Calculate five-number summary
-        five_num = generate_five_number_summary(data)
+        five_num = generate_five_number_summary(data, summary)
         
         # Create a simple visual representation
-        fig, ax = plt.subplots(figsize=(8, 2))
+        fig, ax = new_figure(figsize=(8, 2))
         
         # Plot the number line
         min_val = five_num["Minimum"]
@@ -274,4 +268,4 @@ def all_stats_tab(data):
         ax.spines['left'].set_visible(False)
         ax.spines['right'].set_visible(False)
         
-        st.pyplot(fig)
\ No newline at end of file
+        show_figure(fig)
\ No newline at end of file
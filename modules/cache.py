@@ -0,0 +1,182 @@
+import numpy as np
+import functools
+import hashlib
+import inspect
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from modules.profiling import note
+
+# Memory budget for cached results, shared by every session of the server process
+CACHE_MAX_BYTES = 512 << 20
+
+# Seconds before a cached result is recomputed
+CACHE_TTL = 3600
+
+# Upper bound on the number of cached results, whatever their size
+CACHE_MAX_ENTRIES = 1024
+
+# Byte budget for encoded plot images, configurable in MB through the environment
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get("STATS_APP_IMAGE_CACHE_MB", "128")) << 20
+
+# Bytes hashed at a time when fingerprinting an in-memory dataset
+HASH_BLOCK_SIZE = 1 << 23
+
+
+def _sizeof(obj, seen=None):
+    """Rough number of bytes held by a cached result, including what its objects computed lazily"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0  # Shared or cyclic references are counted once
+    seen.add(id(obj))
+    if isinstance(obj, np.memmap):
+        return 0  # Pages belong to the file, not to the cache
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if hasattr(obj, "memory_usage"):
+        # pandas objects, recognized without importing pandas
+        return int(np.sum(obj.memory_usage(deep=True)))
+    if isinstance(obj, (str, bytes)):
+        return len(obj)
+    if isinstance(obj, (tuple, list)):
+        return sum(_sizeof(item, seen) for item in tuple(obj))
+    if isinstance(obj, dict):
+        return sum(_sizeof(item, seen) for item in tuple(obj.values()))
+    if hasattr(obj, "__dict__") and not callable(obj):
+        # Instance attributes, so cached_property values and other lazy fields are counted too
+        return 64 + sum(_sizeof(item, seen) for item in tuple(vars(obj).values()))
+    return 64
+
+
+class ResultCache:
+    """Thread-safe LRU cache with a time-to-live and a memory budget"""
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (value, size, expiry)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _evict(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.total_bytes -= size
+
+    def get(self, key):
+        """Cached value for the key, or None when it is missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] < time.monotonic():
+                if entry is not None:
+                    self._evict(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entries to stay within budget"""
+        size = _sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._evict(key)
+            self._entries[key] = (value, size, time.monotonic() + self.ttl)
+            self.total_bytes += size
+            self._shrink()
+
+    def resize(self, value):
+        """Re-measure the entries holding value after it grew in place, evicting to stay within budget"""
+        with self._lock:
+            for key, (entry_value, size, expiry) in list(self._entries.items()):
+                if entry_value is value:
+                    new_size = _sizeof(value)
+                    self._entries[key] = (value, new_size, expiry)
+                    self.total_bytes += new_size - size
+            self._shrink()
+
+    def _shrink(self):
+        while self.total_bytes > self.max_bytes or len(self._entries) > self.max_entries:
+            self._evict(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+
+RESULT_CACHE = ResultCache()
+
+# Rendered PNG bytes of the plots, evicted on their own byte budget
+IMAGE_CACHE = ResultCache(max_bytes=IMAGE_CACHE_MAX_BYTES)
+
+# Fingerprints of the arrays seen so far, so each dataset is hashed once per object
+_fingerprints = {}
+
+
+def dataset_key(values):
+    """Content fingerprint of a dataset; memory-mapped files are keyed by path, size and mtime"""
+    entry = _fingerprints.get(id(values))
+    if entry is not None and entry[0]() is values:
+        return entry[1]
+
+    filename = getattr(values, "filename", None)
+    if isinstance(values, np.memmap) and filename:
+        info = os.stat(filename)
+        key = ("file", filename, info.st_size, info.st_mtime_ns, values.offset, values.dtype.str, values.shape)
+    else:
+        flat = np.ascontiguousarray(values, dtype=np.float64).reshape(-1)
+        digest = hashlib.blake2b(digest_size=16)
+        for start in range(0, len(flat), HASH_BLOCK_SIZE // 8):
+            digest.update(flat[start:start + HASH_BLOCK_SIZE // 8])
+        key = ("data", len(flat), digest.hexdigest())
+
+    if isinstance(values, np.ndarray):
+        key_id = id(values)
+        _fingerprints[key_id] = (weakref.ref(values, lambda _: _fingerprints.pop(key_id, None)), key)
+    return key
+
+
+def call_key(func, data, args, kwargs):
+    """Cache key of a call: the function, the dataset fingerprint and the remaining arguments.
+
+    A `summary` argument is derived from the dataset and is left out of the key.
+    """
+    bound = inspect.signature(func).bind(data, *args, **kwargs)
+    bound.apply_defaults()
+    params = tuple(
+        (name, value) for name, value in list(bound.arguments.items())[1:]
+        if name != "summary"
+    )
+    return (func.__module__, func.__qualname__, dataset_key(data), params)
+
+
+def cached(func):
+    """Cache a function of a dataset by its content and the remaining arguments.
+
+    The first argument is the dataset. Results are shared by every session and
+    must not be modified by callers.
+    """
+    @functools.wraps(func)
+    def wrapper(data, *args, **kwargs):
+        key = call_key(func, data, args, kwargs)
+        result = RESULT_CACHE.get(key)
+        note(cache="hit" if result is not None else "miss")
+        if result is None:
+            result = func(data, *args, **kwargs)
+            RESULT_CACHE.put(key, result)
+        return result
+
+    return wrapper
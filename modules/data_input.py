@@ -1,16 +1,119 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
 
+from modules.cache import RESULT_CACHE
+from modules.file_input import (
+    DATA_DIR, detect_format, list_data_files, list_numeric_columns, load_column, open_binary_dataset,
+    resolve_data_path, upload_key
+)
+from modules.stats_engine import describe
+from modules.profiling import timed
+
+# Byte values treated as whitespace between numbers
+WHITESPACE_BYTES = np.frombuffer(b" \t\n\r\v\f", dtype=np.uint8)
+
+
+class DataParseError(ValueError):
+    """Raised when a value in the entered text is not a number"""
+
+    def __init__(self, token, line, position):
+        self.token = token
+        self.line = line
+        self.position = position
+        super().__init__(f"Line {line}: value #{position} ('{token}') is not a number.")
+
+
+def _token_bounds(buffer):
+    """Start and end offsets of the whitespace-separated tokens of a byte buffer"""
+    is_token = ~np.isin(buffer, WHITESPACE_BYTES)
+    starts = np.flatnonzero(is_token & ~np.concatenate(([False], is_token[:-1])))
+    ends = np.flatnonzero(is_token & ~np.concatenate((is_token[1:], [False]))) + 1
+    return starts, ends
+
+
+def _locate_token(raw, index):
+    """Return the text, line number and 1-based position of the index-th token in raw bytes"""
+    buffer = np.frombuffer(raw, dtype=np.uint8)
+    starts, ends = _token_bounds(buffer)
+    index = min(index, len(starts) - 1)
+    start, end = starts[index], ends[index]
+    line = int(np.count_nonzero(buffer[:start] == ord("\n"))) + 1
+    return raw[start:end].decode("utf-8", errors="replace"), line, index + 1
+
+
+def _read(raw):
+    """Values numpy reads from raw bytes followed by a sentinel 0, or None when it raises.
+
+    np.fromstring stops at the first token it cannot read (NumPy 1.x warns, NumPy 2
+    raises). Every token was read exactly when the sentinel was read too, so a partly
+    read token such as "2x" or "1_000" is caught without relying on the warning.
+    """
+    try:
+        return np.fromstring(raw + b" 0", dtype=np.float64, sep=" ")
+    except (ValueError, DeprecationWarning):  # The warning is raised when warnings are errors
+        return None
+
+
+def _reads_whole(raw, n_tokens):
+    read = _read(raw)
+    return read is not None and len(read) == n_tokens + 1
+
+
+def _unreadable_token(raw, starts, ends, read):
+    """DataParseError for the first token numpy cannot read, found with the same parser"""
+    if read is not None:
+        # A partly read token still yields a value, so the culprit is the last value read or the next token
+        for index in (len(read) - 1, len(read)):
+            if 0 <= index < len(starts) and not _reads_whole(raw[starts[index]:ends[index]], 1):
+                return DataParseError(*_locate_token(raw, index))
+    # NumPy raised instead: binary search for the shortest prefix it cannot read
+    good, bad = 0, len(starts)
+    while bad - good > 1:
+        middle = (good + bad) // 2
+        if _reads_whole(raw[:ends[middle - 1]], middle):
+            good = middle
+        else:
+            bad = middle
+    return DataParseError(*_locate_token(raw, bad - 1))
+
+
+def parse_values(text, separator="\n"):
+    """Parse separated numbers into a float64 array with one bulk C-level pass"""
+    if separator not in (" ", "\t", "\n"):
+        text = text.replace(separator, " ")
+    text = text.strip()
+    if not text:
+        return np.empty(0, dtype=np.float64)
+    
+    raw = text.encode("utf-8")
+    starts, ends = _token_bounds(np.frombuffer(raw, dtype=np.uint8))
+    read = _read(raw)
+    if read is None or len(read) != len(starts) + 1:
+        raise _unreadable_token(raw, starts, ends, read)
+    values = read[:-1]
+    
+    # nan and inf are read as numbers, but no statistic or plot can use them
+    finite = np.isfinite(values)
+    if not finite.all():
+        raise DataParseError(*_locate_token(raw, int(np.argmin(finite))))
+    
+    return values
+
+
+@timed("input")
 def data_input_sidebar():
     """Create sidebar for data input and return the entered data"""
     with st.sidebar:
         st.header("Data Input")
-        st.markdown("Enter up to 30 observations. Each value must be a number.")
+        st.markdown("Enter your observations. Each value must be a number.")
         
+        # Memory-mapped files are only offered from a data directory the server was configured with
+        methods = ["Manual Entry", "Sample Datasets", "Upload File"]
+        if DATA_DIR:
+            methods.append("Binary File (memory-mapped)")
         input_method = st.radio(
             "Choose input method:",
-            ["Manual Entry", "Sample Datasets"],
+            methods,
             index=0
         )
         
@@ -21,7 +124,6 @@ def data_input_sidebar():
                 n_values = st.number_input(
                     "Number of observations:",
                     min_value=1,
-                    max_value=30,
                     value=5,
                     step=1
                 )
@@ -37,14 +139,14 @@ def data_input_sidebar():
                 placeholder = "\n".join([f"Value {i+1}" for i in range(min(5, n_values))])
                 input_data = st.text_area(
                     "Enter values (one per line):",
-                    height=min(200, n_values * 40),
+                    height=min(200, max(68, n_values * 40)),
                     placeholder=placeholder
                 )
                 if input_data:
                     try:
-                        data = [float(x.strip()) for x in input_data.split("\n") if x.strip()]
-                    except ValueError:
-                        st.error("❌ All values must be numbers. Please check your input.")
+                        data = parse_values(input_data, "\n")
+                    except DataParseError as e:
+                        st.error(f"❌ {e} All values must be numbers. Please check your input.")
                         return None
             else:
                 sep_map = {"Comma": ",", "Space": " ", "Tab": "\t"}
@@ -56,12 +158,80 @@ def data_input_sidebar():
                 )
                 if input_data:
                     try:
-                        data = [float(x.strip()) for x in input_data.split(sep) if x.strip()]
-                    except ValueError:
-                        st.error("❌ All values must be numbers. Please check your input.")
+                        data = parse_values(input_data, sep)
+                    except DataParseError as e:
+                        st.error(f"❌ {e} All values must be numbers. Please check your input.")
                         return None
                 else:
                     data = []
+        elif input_method == "Upload File":
+            uploaded_file = st.file_uploader(
+                "Upload a CSV, Parquet or Arrow file:",
+                type=["csv", "txt", "parquet", "pq", "arrow", "feather", "ipc"],
+                help="CSV files need a header row. The file is read in chunks, one column at a time."
+            )
+            if uploaded_file is not None:
+                try:
+                    fmt = detect_format(uploaded_file.name)
+                    columns = list_numeric_columns(uploaded_file, fmt)
+                except (ValueError, OSError) as e:
+                    st.error(f"❌ Could not read the file: {e}")
+                    return None
+                if not columns:
+                    st.error("❌ The file has no numeric columns.")
+                    return None
+                
+                column = st.selectbox("Choose a numeric column:", columns)
+                
+                # Keep the parsed column across reruns so the file is only streamed once, and
+                # share it through the result cache with every session that uploads the same file
+                file_key = (uploaded_file.file_id, column)
+                loaded = st.session_state.get("uploaded_column")
+                if loaded is not None and loaded[0] == file_key:
+                    data, n_dropped = loaded[1]
+                else:
+                    try:
+                        content_key = upload_key(uploaded_file, fmt, column)
+                        loaded = RESULT_CACHE.get(content_key)
+                        if loaded is None:
+                            progress_bar = st.progress(0.0, text=f"Reading '{column}'...")
+                            try:
+                                loaded = load_column(
+                                    uploaded_file, fmt, column,
+                                    progress=lambda fraction: progress_bar.progress(
+                                        fraction, text=f"Reading '{column}'... {fraction:.0%}"
+                                    )
+                                )
+                            finally:
+                                progress_bar.empty()
+                            RESULT_CACHE.put(content_key, loaded)
+                    except (ValueError, OSError) as e:
+                        st.error(f"❌ Could not read column '{column}': {e}")
+                        return None
+                    data, n_dropped = loaded
+                    st.session_state["uploaded_column"] = (file_key, loaded)
+                
+                st.success(f"✅ Loaded {len(data):,} observations from column '{column}'")
+                if n_dropped:
+                    st.warning(f"⚠️ Skipped {n_dropped:,} missing or non-numeric values.")
+        elif input_method == "Binary File (memory-mapped)":
+            files = list_data_files(DATA_DIR)
+            if not files:
+                st.warning("⚠️ The data directory has no files.")
+                return None
+            name = st.selectbox(
+                "Choose a .npy or raw float64 file:",
+                files,
+                help="The file is memory-mapped and processed in blocks, so it is never copied into RAM."
+            )
+            try:
+                data = open_binary_dataset(resolve_data_path(DATA_DIR, name))
+                # The first pass over the file is shared with every section and rejects missing values
+                describe(data)
+            except (OSError, ValueError) as e:
+                st.error(f"❌ Could not open the file: {e}")
+                return None
+            st.success(f"✅ Memory-mapped {len(data):,} observations")
         else:  # Sample datasets
             dataset = st.selectbox(
                 "Choose a sample dataset:",
@@ -82,19 +252,15 @@ def data_input_sidebar():
                 "Flower Petals": [5, 12, 6, 8, 14]
             }
             
-            data = sample_data[dataset]
+            data = np.asarray(sample_data[dataset], dtype=np.float64)
             st.success(f"✅ Loaded {len(data)} observations from '{dataset}'")
             
             # Display the loaded data
             st.write("Preview:")
-            st.write(data)
+            st.write(sample_data[dataset])
         
         # Data validation and stats
         if 'data' in locals() and len(data) > 0:
-            if len(data) > 30:
-                st.warning("⚠️ Maximum 30 observations allowed. Using only the first 30.")
-                data = data[:30]
-            
             st.write(f"**Current data:** {len(data)} observations")
             
             if st.button("Clear Data"):
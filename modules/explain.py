@@ -0,0 +1,85 @@
+import streamlit as st
+import numpy as np
+
+from modules.stats_engine import _position_ranks, format_value
+from modules.profiling import span
+
+# Values listed at each end of a long sequence before the middle is elided
+EDGE_VALUES = 10
+
+# Upper bound on the characters of one explanation sent to the browser
+MAX_EXPLANATION_CHARS = 20_000
+
+# Datasets up to this size show their calculation steps without being asked
+EXPANDED_STEPS_LIMIT = 1000
+
+
+def elide(values, separator=", ", ellipsis="…", edge=EDGE_VALUES):
+    """Join the first and last `edge` values of a sequence, eliding the middle when it is long"""
+    n = len(values)
+    if n <= 2 * edge:
+        return separator.join(format_value(x) for x in np.asarray(values[:n]))
+    # Only the listed values are converted, however long the sequence is
+    head = [format_value(x) for x in np.asarray(values[:edge])]
+    tail = [format_value(x) for x in np.asarray(values[n - edge:])]
+    return separator.join(head + [ellipsis] + tail)
+
+
+def elide_sum(values, edge=EDGE_VALUES):
+    """LaTeX sum of the values, eliding the middle terms when there are many"""
+    return elide(values, separator=" + ", ellipsis="\\cdots", edge=edge)
+
+
+def position_steps(summary, p, value, name):
+    """Text locating the (n+1)p position and interpolating at it, clamped to [1, n] as the engine does"""
+    n = summary.n
+    position = p * (n + 1)
+    lower_rank, upper_rank, fraction = _position_ranks(n, p)
+    locate = f"Position of {name} = {p} × (n + 1) = {p} × ({n} + 1) = {position:g}"
+    if not 1 <= position <= n:
+        clamped = lower_rank + 1 + fraction
+        locate += f", outside 1 to {n}, so it is moved to {clamped:g}"
+    if fraction == 0:
+        calculation = f"The {lower_rank + 1}th value in the sorted data: {value}"
+    else:
+        lower_value = summary.value_at(lower_rank)
+        upper_value = summary.value_at(upper_rank)
+        calculation = (
+            f"Between positions {lower_rank + 1} and {upper_rank + 1}: "
+            f"{lower_value} + {fraction:.2f} × ({upper_value} - {lower_value}) = {value}"
+        )
+    return locate, calculation
+
+
+def cap_markdown(text, limit=MAX_EXPLANATION_CHARS):
+    """Truncate markdown that would exceed the payload budget"""
+    if len(text) <= limit:
+        return text
+    # Cut at a line break so no LaTeX expression is left unterminated
+    cut = text.rfind("\n", 0, limit)
+    return text[:cut if cut > 0 else limit] + "\n\n*(explanation truncated)*"
+
+
+class Explanation:
+    """Markdown for the calculation steps, built on first use and capped in size"""
+
+    def __init__(self, build):
+        self._build = build
+        self._text = None
+
+    def __str__(self):
+        if self._text is None:
+            with span("explanation", "format"):
+                self._text = cap_markdown(self._build())
+        return self._text
+
+
+def show_explanation(*steps, key, n=None, label="Show Calculation Steps", expanded=None):
+    """Render the steps behind a toggle, so they are only built when it is switched on"""
+    if expanded is None:
+        expanded = n is None or n <= EXPANDED_STEPS_LIMIT
+    if st.toggle(label, value=expanded, key=key):
+        for i, step in enumerate(steps):
+            if i:
+                st.markdown("---")
+            st.markdown(step)
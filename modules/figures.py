@@ -0,0 +1,64 @@
+import streamlit as st
+import io
+import threading
+import time
+
+from modules.cache import IMAGE_CACHE, call_key
+from modules.metrics import observe_render
+from modules.profiling import note, span, timed
+
+# Resolution of the encoded plot images, matching st.pyplot's default
+IMAGE_DPI = 200
+
+# Streamlit downscales wider images on every call, so they are encoded at most this wide
+MAX_IMAGE_WIDTH = 1460
+
+# Sessions run in threads and matplotlib is not thread-safe, so figures are drawn under this lock
+FIGURE_LOCK = threading.Lock()
+
+
+def new_figure(figsize=(10, 6)):
+    """Figure and axes built with the object-oriented API.
+
+    The figure is never registered with pyplot, so nothing keeps it alive once
+    the rerun lets go of it. matplotlib is imported on the first figure, so
+    pages without plots never load it.
+    """
+    from matplotlib.figure import Figure
+    
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    return fig, ax
+
+
+def show_figure(fig):
+    """Serialize a figure into the page; matplotlib is not thread-safe, so drawing is serialized"""
+    start = time.perf_counter()
+    with FIGURE_LOCK, span("st.pyplot", "encode"):
+        st.pyplot(fig)
+    observe_render("inline", time.perf_counter() - start)
+
+
+@timed("encode")
+def render_png(fig):
+    """Encode a figure as PNG bytes"""
+    buffer = io.BytesIO()
+    with FIGURE_LOCK:
+        dpi = min(IMAGE_DPI, MAX_IMAGE_WIDTH / fig.get_figwidth())
+        fig.savefig(buffer, format="png", dpi=dpi, bbox_inches="tight")
+    return buffer.getvalue()
+
+
+def show_plot(plot, data, *args, **kwargs):
+    """Show plot(data, ...) as an image, reusing the encoded PNG when the same plot was drawn before"""
+    key = call_key(plot, data, args, kwargs)
+    image = IMAGE_CACHE.get(key)
+    cache = "hit" if image is not None else "miss"
+    if image is None:
+        start = time.perf_counter()
+        image = render_png(plot(data, *args, **kwargs))
+        observe_render(plot.__name__, time.perf_counter() - start)
+        IMAGE_CACHE.put(key, image)
+    with span("st.image", "send"):
+        note(plot=plot.__name__, image_cache=cache, bytes=len(image))
+        st.image(image, use_column_width=True)
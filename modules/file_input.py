@@ -0,0 +1,262 @@
+import numpy as np
+import hashlib
+import os
+import tempfile
+import weakref
+
+# Rows parsed per chunk; bounds the memory used while reading a file
+CHUNK_ROWS = 1_000_000
+
+# Values of a column kept in RAM; longer columns are spilled to a temporary file and memory-mapped
+IN_MEMORY_VALUES = 1 << 24
+
+# Directory of the temporary files that spilled columns are memory-mapped from
+SPILL_DIR = os.environ.get("STATS_APP_SPILL_DIR") or tempfile.gettempdir()
+
+# Bytes read at a time when fingerprinting an uploaded file
+HASH_BLOCK_SIZE = 1 << 23
+
+# Directory on the server whose files may be memory-mapped; unset disables memory-mapped input
+DATA_DIR = os.environ.get("STATS_APP_DATA_DIR")
+
+# Files listed from the data directory, so a huge tree does not stall the sidebar
+MAX_LISTED_FILES = 1000
+
+FILE_FORMATS = {
+    ".csv": "csv",
+    ".txt": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+}
+
+
+def detect_format(filename):
+    """Return the file format ('csv', 'parquet' or 'arrow') from the file extension"""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in FILE_FORMATS:
+        raise ValueError(f"Unsupported file type '{extension}'")
+    return FILE_FORMATS[extension]
+
+
+def _file_size(file):
+    """Total size in bytes of a seekable file object"""
+    position = file.tell()
+    size = file.seek(0, os.SEEK_END)
+    file.seek(position)
+    return size
+
+
+def _open_arrow(file):
+    """Open an Arrow IPC file, falling back to the streaming format"""
+    import pyarrow as pa
+
+    file.seek(0)
+    try:
+        return pa.ipc.open_file(file)
+    except pa.ArrowInvalid:
+        file.seek(0)
+        return pa.ipc.open_stream(file)
+
+
+def _coerce_numeric(series):
+    """CSV cells as float64, with anything that is not a number turned into NaN"""
+    import pandas as pd
+
+    return pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64)
+
+
+def list_numeric_columns(file, fmt):
+    """List the numeric columns of a CSV, Parquet or Arrow file without reading its data.
+
+    A CSV column counts as numeric when any of its first rows is a number, by
+    the same coercion load_column applies, so mixed columns are offered too;
+    a column whose first rows are all empty is offered as well.
+    """
+    file.seek(0)
+    if fmt == "csv":
+        import pandas as pd
+
+        preview = pd.read_csv(file, nrows=1000)
+        file.seek(0)
+        return [
+            column for column in preview.columns
+            if preview[column].isna().all() or not np.isnan(_coerce_numeric(preview[column])).all()
+        ]
+
+    import pyarrow as pa
+
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        schema = pq.ParquetFile(file).schema_arrow
+    else:
+        schema = _open_arrow(file).schema
+    file.seek(0)
+    return [
+        field.name for field in schema
+        if pa.types.is_integer(field.type) or pa.types.is_floating(field.type)
+    ]
+
+
+def _arrow_to_numpy(array):
+    """Convert an Arrow array to float64, dropping nulls and NaN as the CSV path does; returns (values, n_dropped)"""
+    import pyarrow.compute as pc
+
+    n_dropped = array.null_count
+    if n_dropped:
+        array = pc.drop_null(array)
+    values = array.to_numpy(zero_copy_only=False).astype(np.float64, copy=False)
+    missing = np.isnan(values)
+    n_missing = int(np.count_nonzero(missing))
+    if n_missing:
+        values = values[~missing]
+    return values, n_dropped + n_missing
+
+
+def iter_column_chunks(file, fmt, column, chunk_rows=CHUNK_ROWS):
+    """Yield (values, n_dropped, fraction_done) for one column, one chunk at a time"""
+    file.seek(0)
+    if fmt == "csv":
+        import pandas as pd
+
+        total_bytes = max(_file_size(file), 1)
+        for chunk in pd.read_csv(file, usecols=[column], chunksize=chunk_rows):
+            values = _coerce_numeric(chunk[column])
+            missing = np.isnan(values)
+            n_dropped = int(np.count_nonzero(missing))
+            if n_dropped:
+                values = values[~missing]
+            yield values, n_dropped, min(file.tell() / total_bytes, 1.0)
+
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(file)
+        total_rows = max(parquet_file.metadata.num_rows, 1)
+        rows_read = 0
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=[column]):
+            rows_read += batch.num_rows
+            values, n_dropped = _arrow_to_numpy(batch.column(0))
+            yield values, n_dropped, rows_read / total_rows
+
+    else:
+        reader = _open_arrow(file)
+        if hasattr(reader, "num_record_batches"):
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+            n_batches = max(reader.num_record_batches, 1)
+        else:
+            batches = reader
+            n_batches = None
+        total_bytes = max(_file_size(file), 1)
+        for i, batch in enumerate(batches):
+            values, n_dropped = _arrow_to_numpy(batch.column(batch.schema.get_field_index(column)))
+            if n_batches is not None:
+                fraction = (i + 1) / n_batches
+            else:
+                fraction = min(file.tell() / total_bytes, 1.0)
+            yield values, n_dropped, fraction
+
+
+def _spill_file():
+    return tempfile.NamedTemporaryFile(dir=SPILL_DIR, prefix="stats-app-", suffix=".f64", delete=False)
+
+
+def load_column(file, fmt, column, progress=None, chunk_rows=CHUNK_ROWS, in_memory_values=IN_MEMORY_VALUES):
+    """Stream one numeric column into a float64 array; returns (values, n_dropped).
+
+    A column longer than in_memory_values is written to a temporary file chunk
+    by chunk and returned memory-mapped, so it is summarized block by block like
+    a binary file. The file is removed once the array is no longer referenced.
+    """
+    buffer = np.empty(min(chunk_rows, in_memory_values), dtype=np.float64)
+    size = 0
+    n_dropped = 0
+    spill = None
+    try:
+        for values, chunk_dropped, fraction in iter_column_chunks(file, fmt, column, chunk_rows):
+            if spill is None and size + len(values) > in_memory_values:
+                spill = _spill_file()
+                buffer[:size].astype("<f8", copy=False).tofile(spill)
+                buffer = None
+            if spill is not None:
+                values.astype("<f8", copy=False).tofile(spill)
+            else:
+                if size + len(values) > len(buffer):
+                    # Grow geometrically so appending stays amortized O(1) per value
+                    grown = np.empty(min(max(2 * len(buffer), size + len(values)), in_memory_values), dtype=np.float64)
+                    grown[:size] = buffer[:size]
+                    buffer = grown
+                buffer[size:size + len(values)] = values
+            size += len(values)
+            n_dropped += chunk_dropped
+            if progress is not None:
+                progress(fraction)
+    except BaseException:
+        if spill is not None:
+            spill.close()
+            os.remove(spill.name)
+        raise
+
+    if spill is not None:
+        spill.close()
+        values = np.memmap(spill.name, dtype="<f8", mode="r")
+        weakref.finalize(values, os.remove, spill.name)
+        return values, n_dropped
+
+    # Release the unused tail of the buffer when it is a sizeable share of the allocation
+    values = buffer[:size].copy() if size < 0.75 * len(buffer) else buffer[:size]
+    return values, n_dropped
+
+
+def upload_key(file, fmt, column):
+    """Cache key of one column of an uploaded file, from a fingerprint of the file's bytes"""
+    digest = hashlib.blake2b(digest_size=16)
+    file.seek(0)
+    for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+        digest.update(block)
+    file.seek(0)
+    return ("upload", digest.hexdigest(), fmt, column)
+
+
+def resolve_data_path(root, name):
+    """Real path of a file under root; raises ValueError when it resolves outside root"""
+    root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f"'{name}' is outside the data directory")
+    return path
+
+
+def list_data_files(root, limit=MAX_LISTED_FILES):
+    """Sorted paths, relative to root, of the visible files that resolve inside root"""
+    names = []
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories[:] = sorted(d for d in subdirectories if not d.startswith("."))
+        for filename in sorted(files):
+            if filename.startswith("."):
+                continue
+            name = os.path.relpath(os.path.join(directory, filename), root)
+            try:
+                resolve_data_path(root, name)
+            except ValueError:
+                continue  # A symlink pointing out of the data directory
+            names.append(name)
+            if len(names) == limit:
+                return names
+    return names
+
+
+def open_binary_dataset(path):
+    """Memory-map a .npy file or a flat little-endian float64 file without reading it into RAM"""
+    if path.lower().endswith(".npy"):
+        values = np.load(path, mmap_mode="r")
+        if values.dtype.kind not in "iuf":
+            raise ValueError(f"'{os.path.basename(path)}' does not contain numeric data")
+        return values.reshape(-1)
+
+    size = os.path.getsize(path)
+    if size == 0 or size % 8:
+        raise ValueError(f"'{os.path.basename(path)}' is not a whole number of float64 values")
+    return np.memmap(path, dtype="<f8", mode="r")
@@ -0,0 +1,64 @@
+import numpy as np
+
+from modules.moments import MomentAccumulator
+from modules.stats_engine import iter_blocks
+from modules.profiling import timed
+
+# Grid points the data are binned onto and the density is evaluated at
+GRID_SIZE = 1024
+
+
+def bandwidth_factor(n, rule="scott"):
+    """Bandwidth as a multiple of the standard deviation: Scott's or Silverman's rule, or a number"""
+    if rule == "scott":
+        return n ** (-1 / 5)
+    if rule == "silverman":
+        return (n * 3 / 4) ** (-1 / 5)
+    return float(rule)
+
+
+def _linear_binning(values, low, delta, gridsize):
+    """Split each value's unit weight between its two neighbouring grid points"""
+    weights = np.zeros(gridsize)
+    for block in iter_blocks(values):
+        position = (np.asarray(block, dtype=np.float64) - low) / delta
+        index = np.clip(np.floor(position).astype(np.int64), 0, gridsize - 2)
+        upper = np.clip(position - index, 0.0, 1.0)
+        weights += np.bincount(index, weights=1.0 - upper, minlength=gridsize)
+        weights += np.bincount(index + 1, weights=upper, minlength=gridsize)
+    return weights
+
+
+@timed("statistics")
+def binned_kde(values, gridsize=GRID_SIZE, bandwidth="scott", cut=0.0, summary=None):
+    """Gaussian kernel density estimate on an even grid, returns (grid, density).
+
+    The data are linearly binned onto the grid in one O(n) pass and the bin
+    weights are convolved with the Gaussian kernel by FFT in O(m log m), instead
+    of summing n kernels at each of the m grid points. The bandwidth rules match
+    scipy.stats.gaussian_kde, and the error against the exact estimate is far
+    below what a plot shows. `summary` supplies n, the extremes and the standard
+    deviation when they are already known.
+    """
+    if summary is None:
+        summary = MomentAccumulator()
+        for block in iter_blocks(values):
+            summary.merge(MomentAccumulator.from_array(block))
+        n, std = summary.n, np.sqrt(summary.m2 / (summary.n - 1))
+    else:
+        n, std = summary.n, summary.std_dev()
+    bw = std * bandwidth_factor(n, bandwidth)
+
+    low = summary.minimum - cut * bw
+    high = summary.maximum + cut * bw
+    grid = np.linspace(low, high, gridsize)
+    delta = grid[1] - grid[0]
+    weights = _linear_binning(values, low, delta, gridsize)
+
+    # Kernel at every grid offset, so the convolution is complete rather than truncated
+    offsets = np.arange(-(gridsize - 1), gridsize) * delta
+    kernel = np.exp(-0.5 * (offsets / bw) ** 2)
+    size = 1 << int(np.ceil(np.log2(3 * gridsize - 2)))
+    convolved = np.fft.irfft(np.fft.rfft(weights, size) * np.fft.rfft(kernel, size), size)
+    density = convolved[gridsize - 1:2 * gridsize - 1] / (n * bw * np.sqrt(2 * np.pi))
+    return grid, np.maximum(density, 0.0)
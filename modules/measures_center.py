@@ -1,17 +1,34 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import textwrap
 
+from modules.stats_engine import describe, heavy_hitter_modes
+from modules.cache import cached
+from modules.figures import new_figure, show_figure
+from modules.explain import Explanation, elide, elide_sum, position_steps, show_explanation
+from modules.profiling import timed
 
-def calculate_mean(data):
+# Rows shown in the frequency table and chart; the most frequent values are kept beyond this
+FREQUENCY_TABLE_ROWS = 50
+
+
+@timed("statistics")
+@cached
+def calculate_mean(data, summary=None):
     """Calculate the mean with step-by-step explanation"""
-    n = len(data)
-    sum_data = sum(data)
-    mean_value = sum_data / n
+    if summary is None:
+        summary = describe(data)
+    n = summary.n
+    sum_data = summary.total
+    mean_value = summary.mean
+    
+    # Only the first and last terms are written out, so the LaTeX stays small for any n;
+    # the steps keep these strings rather than the summary, so a cached result pins no data
+    terms = elide_sum(summary.values)
     
-    steps = f"""
+    def build():
+        return f"""
     ### Mean Calculation
     
     The mean of a set of measurements is the sum of the measurements divided by the total number of measurements.
@@ -19,32 +36,31 @@ def calculate_mean(data):
     **Formula**: $\\bar{{x}} = \\frac{{\\sum_{{i=1}}^{{n}} x_i}}{{n}}$
     
     **Step 1**: Sum all measurements
-    $\\displaystyle\\sum_{{i=1}}^{{{n}}} x_i = {' + '.join([str(x) for x in data])} = {sum_data}$
+    $\\displaystyle\\sum_{{i=1}}^{{{n}}} x_i = {terms} = {sum_data}$
     
     **Step 2**: Divide by the number of measurements (n = {n})
     $\\bar{{x}} = \\displaystyle\\frac{{{sum_data}}}{{{n}}} = {mean_value:.6f}$
     """
     
-    return mean_value, steps
+    return mean_value, Explanation(build)
 
-def calculate_median(data):
+@timed("statistics")
+@cached
+def calculate_median(data, summary=None):
     """Calculate the median with step-by-step explanation"""
-    n = len(data)
-    sorted_data = sorted(data)
-    position = 0.5 * (n + 1)
-    pos_int = int(position)
-    pos_frac = position - pos_int
-    
-    if pos_frac == 0:
-        median_value = sorted_data[pos_int - 1]  # Adjust for 0-indexed list
-        calculation = f"The {pos_int}th value in the sorted data: {median_value}"
+    if summary is None:
+        summary = describe(data)
+    n = summary.n
+    median_value = summary.median
+    locate, calculation = position_steps(summary, 0.5, median_value, "the median")
+    
+    if summary.out_of_core:
+        sorted_data = f"({n:,} values, read from disk in blocks rather than listed)"
     else:
-        lower_value = sorted_data[pos_int - 1]  # Adjust for 0-indexed list
-        upper_value = sorted_data[pos_int]  # Adjust for 0-indexed list
-        median_value = lower_value + pos_frac * (upper_value - lower_value)
-        calculation = f"Between positions {pos_int} and {pos_int + 1}: {lower_value} + {pos_frac:.2f} × ({upper_value} - {lower_value}) = {median_value}"
+        sorted_data = elide(summary.sorted_values)
     
-    steps = f"""
+    def build():
+        return f"""
     ### Median Calculation
     
     The median is the middle value when the measurements are ranked from smallest to largest.
@@ -53,45 +69,45 @@ def calculate_median(data):
     {sorted_data}
     
     **Step 2**: Find the position of the median
-    Position = 0.5 × (n + 1) = 0.5 × ({n} + 1) = {position}
+    {locate}
     
     **Step 3**: Determine the median
     {calculation}
     """
     
-    return median_value, steps
+    return median_value, Explanation(build)
 
-def calculate_mode(data):
-    """Calculate the mode with step-by-step explanation without displaying the frequency table."""
-    # Count occurrences of each value
-    value_counts = {}
-    for x in data:
-        value_counts[x] = value_counts.get(x, 0) + 1
+@timed("statistics")
+@cached
+def calculate_mode(data, summary=None, backend=None, top_k=None):
+    """Calculate the mode with step-by-step explanation without displaying the frequency table.
 
-    # Find the maximum frequency
-    max_count = max(value_counts.values())
+    backend is "exact" (count every distinct value) or "heavy_hitters" (Misra-Gries
+    summary in bounded memory); memory-mapped data defaults to heavy hitters.
+    top_k limits the frequency table to the most frequent values.
+    """
+    if summary is None:
+        summary = describe(data)
+    if backend is None:
+        backend = "heavy_hitters" if summary.out_of_core else "exact"
     
-    # Determine mode and mode type
-    if max_count == 1:
-        mode_values = []
-        mode_type = "No mode"
-    else:
-        mode_values = [x for x, count in value_counts.items() if count == max_count]
-        if len(mode_values) == 1:
-            mode_type = "Unimodal"
-        elif len(mode_values) == 2:
-            mode_type = "Bimodal"
-        else:
-            mode_type = "Multimodal"
+    if backend == "heavy_hitters":
+        return _heavy_hitter_mode(summary, top_k)
+    
+    # Distinct values and their counts come from one run-length pass over the sorted data
+    distinct_values, counts = summary.frequencies
+    max_count = summary.max_count
+    mode_values = summary.mode_values
+    mode_type = summary.mode_type
     
     # Generate explanation without the frequency table
     if mode_values:
-        mode_str = ", ".join(str(x) for x in sorted(mode_values, key=lambda x: float(x) if isinstance(x, (int, float)) or (isinstance(x, str) and x.replace('.', '', 1).isdigit()) else float('inf')))
+        mode_str = elide(mode_values)
         result = f"{mode_str} (each appears {max_count} times)"
     else:
         result = "No mode (all values appear only once)"
     
-    steps = textwrap.dedent(f"""
+    steps = Explanation(lambda: textwrap.dedent(f"""
     ### Mode Calculation
 
     **Step 1**: Count the frequency of each value.
@@ -102,28 +118,64 @@ def calculate_mode(data):
     **Step 3**: Determine the mode.  
     Mode type: {mode_type}  
     Result: {result}
-    """)
+    """))
+    
+    if top_k is not None and len(counts) > top_k:
+        # Most frequent values first, ties broken by value
+        order = np.lexsort((distinct_values, -counts))[:top_k]
+        distinct_values, counts = distinct_values[order], counts[order]
     
-    # Create frequency DataFrame
+    # Frequency table, sorted by value unless cut down to the most frequent values
     freq_df = pd.DataFrame({
-        "Value": list(value_counts.keys()),
-        "Frequency": list(value_counts.values())
+        "Value": distinct_values,
+        "Frequency": counts
     })
     
-    # Try to convert values to numeric for better sorting
-    try:
-        freq_df["Value"] = pd.to_numeric(freq_df["Value"])
-    except (ValueError, TypeError):
-        # If conversion fails, leave as is
-        pass
-        
-    # Sort values and reset index
-    freq_df = freq_df.sort_values(by="Value").reset_index(drop=True)
+    return mode_values, steps, freq_df
+
+
+def _heavy_hitter_mode(summary, top_k=None):
+    """Mode and top-k frequency table estimated from the Misra-Gries summary"""
+    heavy_hitters = summary.heavy_hitters
+    values, counts = heavy_hitters.top_k(top_k or heavy_hitters.k)
+    mode_values, max_count, guaranteed = heavy_hitter_modes(heavy_hitters)
+    error = heavy_hitters.error_bound
+    n, k = summary.n, heavy_hitters.k
+    
+    if not mode_values and error == 0:
+        result = "No mode (all values appear only once)"
+    elif not mode_values:
+        result = f"No mode detected (no value is known to appear more than once; any value appears at most {error + 1:,} times)"
+    else:
+        mode_str = elide(mode_values)
+        result = f"{mode_str} (each appears at least {max_count:,} times)"
+        if not guaranteed:
+            result += " - approximate, another value may be as frequent"
+    
+    steps = Explanation(lambda: textwrap.dedent(f"""
+    ### Mode Calculation (heavy hitters)
+
+    **Step 1**: Stream the {n:,} values through a Misra-Gries summary with {k:,} counters.  
+    Each estimated count is at most {error:,} below the true count (bound n / (k + 1) = {n // (k + 1):,}).
+
+    **Step 2**: Identify the value(s) with the highest estimated frequency.  
+    Estimated maximum frequency: {max_count:,} to {max_count + error:,}
+
+    **Step 3**: Determine the mode.  
+    Result: {result}
+    """))
+    
+    freq_df = pd.DataFrame({
+        "Value": values,
+        "Frequency": counts,
+        "Upper Bound": counts + error
+    })
     
     return mode_values, steps, freq_df
 
 
-def measures_center_tab(data):
+@timed("section")
+def measures_center_tab(data, summary):
     """Display the measures of center tab content"""
     st.header("📏 Measures of Center")
     st.write("Learn how to calculate the mean, median, and mode with step-by-step explanations.")
@@ -136,8 +188,10 @@ def measures_center_tab(data):
     )
     
     # Display the current data
-    sorted_data = sorted(data)
-    st.write("**Current data (sorted):**", sorted_data)
+    if summary.out_of_core:
+        st.write(f"**Current data:** {summary.n:,} memory-mapped values (processed in blocks, not loaded into memory)")
+    else:
+        st.write(f"**Current data (sorted):** {elide(summary.sorted_values)}")
     
     # Create columns for displaying results
     if measure == "Compare All":
@@ -145,65 +199,91 @@ def measures_center_tab(data):
         
         with col1:
             st.subheader("Mean")
-            mean_value, mean_steps = calculate_mean(data)
+            mean_value, mean_steps = calculate_mean(data, summary)
             st.metric("Mean", f"{mean_value:.4f}")
         
         with col2:
             st.subheader("Median")
-            median_value, median_steps = calculate_median(data)
-            st.metric("Median", f"{median_value:.4f}")
+            median_value, median_steps = calculate_median(data, summary)
+            st.metric("Median" if summary.exact_quantiles else "Median (approximate)", f"{median_value:.4f}")
+            if summary.sketch is not None:
+                st.caption(summary.approximation_note("median"))
         
         with col3:
             st.subheader("Mode")
-            mode_values, mode_steps, _ = calculate_mode(data)
+            mode_values, mode_steps, _ = calculate_mode(data, summary)
             if mode_values:
-                mode_display = ", ".join([str(x) for x in sorted(mode_values)])
+                mode_display = elide(mode_values, edge=3)
             else:
                 mode_display = "No mode"
             st.metric("Mode", mode_display)
         
         # Display all steps
-        with st.expander("Show Calculation Steps", expanded=True):
-            st.markdown(mean_steps)
-            st.markdown("---")
-            st.markdown(median_steps)
-            st.markdown("---")
-            st.markdown(mode_steps)
+        show_explanation(mean_steps, median_steps, mode_steps, key="center_steps", n=summary.n)
     
     elif measure == "Mean":
-        mean_value, steps = calculate_mean(data)
+        mean_value, steps = calculate_mean(data, summary)
         st.metric("Mean", f"{mean_value:.4f}")
-        st.markdown(steps)
+        show_explanation(steps, key="center_steps", n=summary.n)
     
     elif measure == "Median":
-        median_value, steps = calculate_median(data)
-        st.metric("Median", f"{median_value:.4f}")
-        st.markdown(steps)
+        median_value, steps = calculate_median(data, summary)
+        st.metric("Median" if summary.exact_quantiles else "Median (approximate)", f"{median_value:.4f}")
+        if summary.sketch is not None:
+            st.caption(summary.approximation_note("median"))
+        show_explanation(steps, key="center_steps", n=summary.n)
     
     elif measure == "Mode":
-        mode_values, steps, freq_df = calculate_mode(data)
+        if summary.out_of_core:
+            # Counting every distinct value of a memory-mapped file is not bounded in memory
+            backend = "heavy_hitters"
+        else:
+            counting = st.radio(
+                "Frequency counting:",
+                ["Exact", "Heavy hitters (Misra-Gries)"],
+                horizontal=True
+            )
+            backend = "exact" if counting == "Exact" else "heavy_hitters"
+        mode_values, steps, freq_df = calculate_mode(data, summary, backend, top_k=FREQUENCY_TABLE_ROWS)
         if mode_values:
-            mode_display = ", ".join([str(x) for x in sorted(mode_values)])
+            mode_display = elide(mode_values, edge=3)
         else:
             mode_display = "No mode"
         st.metric("Mode", mode_display)
-        st.markdown(steps)
+        show_explanation(steps, key="center_steps", n=summary.n)
         
         # Display frequency distribution in a nice format
         st.write("")
         st.write("**Interactive Frequency Distribution:**")
         
+        values = freq_df["Value"].to_numpy()
+        frequencies = freq_df["Frequency"].to_numpy()
+        has_decimals = bool(np.any(values != np.floor(values)))
+        if backend == "heavy_hitters" and freq_df.empty:
+            st.caption("No value occurs often enough to be kept by the heavy-hitter summary.")
+        elif backend == "heavy_hitters":
+            st.caption(
+                f"The {len(freq_df)} most frequent values by estimated count. "
+                "Frequency is a lower bound on the true count and Upper Bound an upper bound."
+            )
+        elif len(freq_df) < len(summary.distinct_values):
+            st.caption(f"Showing the {len(freq_df)} most frequent of {len(summary.distinct_values):,} distinct values.")
+        
         # Display with conditional formatting and custom column config
         st.dataframe(
             freq_df,
             column_config={
                 "Value": st.column_config.NumberColumn(
                     "Value",
-                    format="%.2f" if any(x != int(x) for x in freq_df['Value']) else "%d"
+                    format="%.2f" if has_decimals else "%d"
                 ),
                 "Frequency": st.column_config.NumberColumn(
                     "Frequency", 
                     format="%d"
+                ),
+                "Upper Bound": st.column_config.NumberColumn(
+                    "Upper Bound",
+                    format="%d"
                 )
             },
             hide_index=True,
@@ -214,65 +294,25 @@ def measures_center_tab(data):
         if not freq_df.empty:
             st.write("**Frequency Visualization:**")
             
-            # Create a copy of the dataframe for visualization
-            chart_data = freq_df.copy()
-            
             # Sort by frequency for better visualization
-            chart_data = chart_data.sort_values(by="Frequency")
-            
-            # Make sure values are numeric for comparison with mode_values when possible
-            try:
-                chart_data['Value'] = pd.to_numeric(chart_data['Value'])
-            except (ValueError, TypeError):
-                pass
-
-            # Create color list for bars
-            chart_colors = []
-            for val in chart_data['Value']:
-                try:
-                    val_numeric = float(val) if isinstance(val, str) else val
-                    mode_values_numeric = [float(mv) if isinstance(mv, str) else mv for mv in mode_values]
-                    
-                    if any(abs(val_numeric - mv_num) < 1e-10 for mv_num in mode_values_numeric):
-                        chart_colors.append("#1f77b4")  # Highlight color for mode values
-                    else:
-                        chart_colors.append("#aec7e8")  # Regular color
-                except (ValueError, TypeError):
-                    chart_colors.append("#aec7e8")  # Default color if conversion fails
+            order = np.argsort(frequencies, kind="stable")
+            values = values[order]
+            frequencies = frequencies[order]
             
-            # Format values for display
-            try:
-                # Check if values contain decimals
-                is_float = any(isinstance(x, (float, np.float64)) and x != int(x) 
-                               for x in chart_data['Value'] if pd.notna(x))
-                
-                if is_float:
-                    value_labels = [f"{float(x):.2f}" if pd.notna(x) else "" for x in chart_data['Value']]
-                else:
-                    value_labels = [f"{int(float(x))}" if pd.notna(x) else "" for x in chart_data['Value']]
-            except (ValueError, TypeError):
-                # If conversion fails, use string representation
-                value_labels = [str(x) for x in chart_data['Value']]
+            # Highlight the mode values
+            is_mode = np.isin(values, mode_values)
+            chart_colors = np.where(is_mode, "#1f77b4", "#aec7e8")
+            value_labels = np.char.mod("%.2f" if has_decimals else "%d", values)
             
             # Create the plot
-            fig, ax = plt.subplots(figsize=(10, 5))
-            bars = ax.barh(value_labels, chart_data['Frequency'], color=chart_colors)
-            
-            # Highlight bars for mode values
-            for i, val in enumerate(chart_data['Value']):
-                try:
-                    val_numeric = float(val) if isinstance(val, str) else val
-                    mode_values_numeric = [float(mv) if isinstance(mv, str) else mv for mv in mode_values]
-                    
-                    if any(abs(val_numeric - mv_num) < 1e-10 for mv_num in mode_values_numeric):
-                        bars[i].set_edgecolor('black')
-                        bars[i].set_linewidth(2)
-                except (ValueError, TypeError):
-                    pass  # Skip if conversion fails
+            fig, ax = new_figure(figsize=(10, 5))
+            bars = ax.barh(
+                value_labels, frequencies, color=chart_colors,
+                edgecolor="black", linewidth=np.where(is_mode, 2, 0)
+            )
             
             # Add frequency labels on the bars
-            for i, v in enumerate(chart_data['Frequency']):
-                ax.text(v + 0.1, i, str(v), va='center')
+            ax.bar_label(bars, padding=3)
             
             # Set labels and title
             ax.set_xlabel('Frequency')
@@ -280,7 +320,7 @@ def measures_center_tab(data):
             ax.set_title('Frequency Distribution')
             
             # Display the chart
-            st.pyplot(fig)
+            show_figure(fig)
     
     # Provide context about when to use each measure
     with st.expander("When to use each measure of center"):
@@ -1,14 +1,22 @@
 import streamlit as st
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-import scipy.stats as stats
 
-def calculate_range(data):
+from modules.stats_engine import describe
+from modules.cache import cached
+from modules.figures import new_figure, show_figure
+from modules.explain import Explanation, elide, position_steps, show_explanation
+from modules.outliers import INNER_FENCE, OUTER_FENCE, find_outliers
+from modules.profiling import timed
+
+@timed("statistics")
+@cached
+def calculate_range(data, summary=None):
     """Calculate the range with step-by-step explanation"""
-    min_val = min(data)
-    max_val = max(data)
-    range_val = max_val - min_val
+    if summary is None:
+        summary = describe(data)
+    min_val = summary.minimum
+    max_val = summary.maximum
+    range_val = summary.range
     
     steps = f"""
     ### Range Calculation
@@ -29,39 +37,30 @@ def calculate_range(data):
     
     return range_val, steps
 
-def calculate_variance(data, is_population=False):
+@timed("statistics")
+@cached
+def calculate_variance(data, is_population=False, summary=None):
     """Calculate the variance with step-by-step explanation"""
-    n = len(data)
-    mean_val = sum(data) / n
-    
-    # Calculate sum of squared deviations
-    deviations = [x - mean_val for x in data]
-    squared_devs = [dev ** 2 for dev in deviations]
-    sum_squared_devs = sum(squared_devs)
+    if summary is None:
+        summary = describe(data)
+    n = summary.n
+    mean_val = summary.mean
+    sum_squared_devs = summary.m2
+    variance = summary.variance(is_population)
     
-    # Calculate variance
     if is_population:
         divisor = n
-        variance = sum_squared_devs / n
         formula = r"\sigma^2 = \frac{\sum_{i=1}^{N}(x_i - \mu)^2}{N}"
         notation = "σ²"
     else:
         divisor = n - 1
-        variance = sum_squared_devs / (n - 1)
         formula = r"s^2 = \frac{\sum_{i=1}^{n}(x_i - \bar{x})^2}{n-1}"
         notation = "s²"
     
-    # Create a table for the calculation
-    calc_table = pd.DataFrame({
-        "x_i": data,
-        "x_i - mean": deviations,
-        "(x_i - mean)²": squared_devs
-    })
-    
     # Alternative calculation method
-    sum_x = sum(data)
-    sum_x_squared = sum([x ** 2 for x in data])
-    alt_variance = (sum_x_squared - (sum_x ** 2) / n) / divisor
+    sum_x = summary.total
+    sum_x_squared = summary.total_squares
+    alt_variance = (sum_x_squared - (sum_x ** 2) / n) / divisor if divisor > 0 else float("nan")
     
     steps = f"""
     ### {'Population' if is_population else 'Sample'} Variance Calculation
@@ -71,7 +70,7 @@ def calculate_variance(data, is_population=False):
     **Formula**: ${formula}$
     
     **Step 1**: Calculate the mean
-    $\\text{{mean}} = \\displaystyle\\frac{{\\sum_{{i=1}}^{{{n}}} x_i}}{{{n}}} = \\displaystyle\\frac{{{sum(data)}}}{{{n}}} = {mean_val:.6f}$
+    $\\text{{mean}} = \\displaystyle\\frac{{\\sum_{{i=1}}^{{{n}}} x_i}}{{{n}}} = \\displaystyle\\frac{{{sum_x}}}{{{n}}} = {mean_val:.6f}$
     
     
     
@@ -97,10 +96,14 @@ def calculate_variance(data, is_population=False):
     
     return variance, steps
 
-def calculate_std_dev(data, is_population=False):
+@timed("statistics")
+@cached
+def calculate_std_dev(data, is_population=False, summary=None):
     """Calculate the standard deviation with step-by-step explanation"""
-    variance, variance_steps = calculate_variance(data, is_population)
-    std_dev = np.sqrt(variance)
+    if summary is None:
+        summary = describe(data)
+    variance, variance_steps = calculate_variance(data, is_population, summary)
+    std_dev = summary.std_dev(is_population)
     
     if is_population:
         notation = "σ"
@@ -131,45 +134,29 @@ def calculate_std_dev(data, is_population=False):
     
     return std_dev, steps, variance_steps
 
-def calculate_iqr(data):
+@timed("statistics")
+@cached
+def calculate_iqr(data, summary=None):
     """Calculate the interquartile range with step-by-step explanation"""
-    n = len(data)
-    sorted_data = sorted(data)
+    if summary is None:
+        summary = describe(data)
+    n = summary.n
+    q1 = summary.q1
+    q3 = summary.q3
     
-    # Calculate positions of quartiles
-    q1_pos = 0.25 * (n + 1)
-    q3_pos = 0.75 * (n + 1)
+    q1_pos, q1_calc = position_steps(summary, 0.25, q1, "Q1")
+    q3_pos, q3_calc = position_steps(summary, 0.75, q3, "Q3")
     
-    # Calculate Q1
-    q1_int = int(q1_pos)
-    q1_frac = q1_pos - q1_int
+    # Calculate IQR
+    iqr = summary.iqr
     
-    if q1_frac == 0:
-        q1 = sorted_data[q1_int - 1]  # Adjust for 0-indexed list
-        q1_calc = f"The {q1_int}th value in the sorted data: {q1}"
-    else:
-        q1_lower = sorted_data[q1_int - 1]  # Adjust for 0-indexed list
-        q1_upper = sorted_data[q1_int]  # Adjust for 0-indexed list
-        q1 = q1_lower + q1_frac * (q1_upper - q1_lower)
-        q1_calc = f"Between positions {q1_int} and {q1_int + 1}: {q1_lower} + {q1_frac:.2f} × ({q1_upper} - {q1_lower}) = {q1}"
-    
-    # Calculate Q3
-    q3_int = int(q3_pos)
-    q3_frac = q3_pos - q3_int
-    
-    if q3_frac == 0:
-        q3 = sorted_data[q3_int - 1]  # Adjust for 0-indexed list
-        q3_calc = f"The {q3_int}th value in the sorted data: {q3}"
+    if summary.out_of_core:
+        sorted_data = f"({n:,} values, read from disk in blocks rather than listed)"
     else:
-        q3_lower = sorted_data[q3_int - 1]  # Adjust for 0-indexed list
-        q3_upper = sorted_data[q3_int]  # Adjust for 0-indexed list
-        q3 = q3_lower + q3_frac * (q3_upper - q3_lower)
-        q3_calc = f"Between positions {q3_int} and {q3_int + 1}: {q3_lower} + {q3_frac:.2f} × ({q3_upper} - {q3_lower}) = {q3}"
-    
-    # Calculate IQR
-    iqr = q3 - q1
+        sorted_data = elide(summary.sorted_values)
     
-    steps = f"""
+    def build():
+        return f"""
     ### Interquartile Range (IQR) Calculation
     
     The IQR is the range of the middle 50% of the data.
@@ -180,13 +167,13 @@ def calculate_iqr(data):
     {sorted_data}
     
     **Step 2**: Find the position of Q1 (first quartile)
-    Position of Q1 = 0.25 × (n + 1) = 0.25 × ({n} + 1) = {q1_pos}
+    {q1_pos}
     
     **Step 3**: Calculate Q1
     {q1_calc}
     
     **Step 4**: Find the position of Q3 (third quartile)
-    Position of Q3 = 0.75 × (n + 1) = 0.75 × ({n} + 1) = {q3_pos}
+    {q3_pos}
     
     **Step 5**: Calculate Q3
     {q3_calc}
@@ -195,15 +182,18 @@ def calculate_iqr(data):
     $IQR = Q_3 - Q_1 = {q3} - {q1} = {iqr}$
     """
     
-    return iqr, steps, q1, q3
+    return iqr, Explanation(build), q1, q3
 
-def calculate_cv(data):
+@timed("statistics")
+@cached
+def calculate_cv(data, summary=None):
     """Calculate the coefficient of variation with step-by-step explanation"""
-    n = len(data)
-    mean_val = sum(data) / n
-    variance, _ = calculate_variance(data, is_population=False)
-    std_dev = np.sqrt(variance)
-    cv = (std_dev / mean_val) * 100
+    if summary is None:
+        summary = describe(data)
+    n = summary.n
+    mean_val = summary.mean
+    std_dev = summary.std_dev()
+    cv = summary.cv
     
     steps = f"""
     ### Coefficient of Variation (CV) Calculation
@@ -213,7 +203,7 @@ def calculate_cv(data):
     **Formula**: $CV = \\frac{{s}}{{\\bar{{x}}}} \\times 100\\%$
     
     **Step 1**: Calculate the mean
-    $\\bar{{x}} = \\frac{{\\sum_{{i=1}}^{{{n}}} x_i}}{{{n}}} = \\frac{{{sum(data)}}}{{{n}}} = {mean_val:.6f}$
+    $\\bar{{x}} = \\frac{{\\sum_{{i=1}}^{{{n}}} x_i}}{{{n}}} = \\frac{{{summary.total}}}{{{n}}} = {mean_val:.6f}$
     
     **Step 2**: Calculate the standard deviation
     $s = {std_dev:.6f}$ (as calculated earlier)
@@ -231,7 +221,8 @@ def calculate_cv(data):
     
     return cv, steps
 
-def measures_variability_tab(data):
+@timed("section")
+def measures_variability_tab(data, summary):
     """Display the measures of variability tab content"""
     st.header("📊 Measures of Variability")
     st.write("Learn how to calculate various measures of spread with step-by-step explanations.")
@@ -244,8 +235,10 @@ def measures_variability_tab(data):
     )
     
     # Display the current data
-    sorted_data = sorted(data)
-    st.write("**Current data (sorted):**", sorted_data)
+    if summary.out_of_core:
+        st.write(f"**Current data:** {summary.n:,} memory-mapped values (processed in blocks, not loaded into memory)")
+    else:
+        st.write(f"**Current data (sorted):** {elide(summary.sorted_values)}")
     
     # Create columns for displaying results
     if measure == "Compare All":
@@ -253,58 +246,51 @@ def measures_variability_tab(data):
         
         with col1:
             st.subheader("Range")
-            range_val, _ = calculate_range(data)
+            range_val, _ = calculate_range(data, summary)
             st.metric("Range", f"{range_val:.4f}")
             
             st.subheader("IQR")
-            iqr_val, _, q1, q3 = calculate_iqr(data)
-            st.metric("IQR", f"{iqr_val:.4f}")
+            iqr_val, _, q1, q3 = calculate_iqr(data, summary)
+            st.metric("IQR" if summary.exact_quantiles else "IQR (approximate)", f"{iqr_val:.4f}")
+            if summary.sketch is not None:
+                st.caption(f"Q1 {summary.approximation_note('q1')}")
+                st.caption(f"Q3 {summary.approximation_note('q3')}")
         
         with col2:
             is_population = st.checkbox("Treat as population data", key="variability_compare_all_population")
             
             st.subheader("Variance")
-            variance, _ = calculate_variance(data, is_population)
+            variance, _ = calculate_variance(data, is_population, summary)
             st.metric("Variance", f"{variance:.4f}")
             
             st.subheader("CV")
-            cv, _ = calculate_cv(data)
+            cv, _ = calculate_cv(data, summary)
             st.metric("CV", f"{cv:.2f}%")
         
         with col3:
             st.subheader("Standard Deviation")
-            std_dev, _, _ = calculate_std_dev(data, is_population)
+            std_dev, _, _ = calculate_std_dev(data, is_population, summary)
             st.metric("Standard Deviation", f"{std_dev:.4f}")
             
             st.write("**Empirical Rule:**")
             if len(data) > 10:  # Only show if reasonable amount of data
-                mean_val = sum(data) / len(data)
+                mean_val = summary.mean
                 st.write(f"- ~68% between {mean_val - std_dev:.4f} and {mean_val + std_dev:.4f}")
                 st.write(f"- ~95% between {mean_val - 2*std_dev:.4f} and {mean_val + 2*std_dev:.4f}")
                 st.write(f"- ~99.7% between {mean_val - 3*std_dev:.4f} and {mean_val + 3*std_dev:.4f}")
         
         # Display calculation steps
-        with st.expander("Show Calculation Steps", expanded=True):
-            range_val, range_steps = calculate_range(data)
-            variance, var_steps = calculate_variance(data, is_population)
-            std_dev, std_steps, _ = calculate_std_dev(data, is_population)
-            iqr_val, iqr_steps, _, _ = calculate_iqr(data)
-            cv, cv_steps = calculate_cv(data)
-            
-            st.markdown(range_steps)
-            st.markdown("---")
-            st.markdown(var_steps)
-            st.markdown("---")
-            st.markdown(std_steps)
-            st.markdown("---")
-            st.markdown(iqr_steps)
-            st.markdown("---")
-            st.markdown(cv_steps)
+        range_val, range_steps = calculate_range(data, summary)
+        variance, var_steps = calculate_variance(data, is_population, summary)
+        std_dev, std_steps, _ = calculate_std_dev(data, is_population, summary)
+        iqr_val, iqr_steps, _, _ = calculate_iqr(data, summary)
+        cv, cv_steps = calculate_cv(data, summary)
+        show_explanation(range_steps, var_steps, std_steps, iqr_steps, cv_steps, key="variability_steps", n=summary.n)
     
     elif measure == "Range":
-        range_val, steps = calculate_range(data)
+        range_val, steps = calculate_range(data, summary)
         st.metric("Range", f"{range_val:.4f}")
-        st.markdown(steps)
+        show_explanation(steps, key="variability_steps", n=summary.n)
         st.markdown("""
         #### About the Range
         
@@ -316,9 +302,9 @@ def measures_variability_tab(data):
     
     elif measure == "Variance":
         is_population = st.checkbox("Treat as population data", key="variability_variance_population")
-        variance, steps = calculate_variance(data, is_population)
+        variance, steps = calculate_variance(data, is_population, summary)
         st.metric("Variance", f"{variance:.6f}")
-        st.markdown(steps)
+        show_explanation(steps, key="variability_steps", n=summary.n)
         st.markdown("""
         #### About the Variance
         
@@ -330,16 +316,15 @@ def measures_variability_tab(data):
     
     elif measure == "Standard Deviation":
         is_population = st.checkbox("Treat as population data", key="variability_std_dev_population")
-        std_dev, steps, var_steps = calculate_std_dev(data, is_population)
+        std_dev, steps, var_steps = calculate_std_dev(data, is_population, summary)
         st.metric("Standard Deviation", f"{std_dev:.6f}")
-        st.markdown(steps)
+        show_explanation(steps, key="variability_steps", n=summary.n)
         
-        with st.expander("Show Variance Calculation"):
-            st.markdown(var_steps)
+        show_explanation(var_steps, key="variability_variance_steps", label="Show Variance Calculation", expanded=False)
         
         st.subheader("The Empirical Rule")
         if len(data) > 10:  # Only show if reasonable amount of data
-            mean_val = sum(data) / len(data)
+            mean_val = summary.mean
             col1, col2 = st.columns(2)
             
             with col1:
@@ -349,8 +334,10 @@ def measures_variability_tab(data):
                 st.write(f"- ~99.7% between {mean_val - 3*std_dev:.4f} and {mean_val + 3*std_dev:.4f}")
             
             with col2:
+                import scipy.stats as stats
+                
                 # Create a simplified normal distribution visualization
-                fig, ax = plt.subplots(figsize=(8, 4))
+                fig, ax = new_figure(figsize=(8, 4))
                 x = np.linspace(mean_val - 4*std_dev, mean_val + 4*std_dev, 1000)
                 y = stats.norm.pdf(x, mean_val, std_dev)
                 
@@ -374,28 +361,37 @@ def measures_variability_tab(data):
                 ax.axvline(mean_val + 3*std_dev, color='red', linestyle=':')
                 ax.axvline(mean_val - 3*std_dev, color='red', linestyle=':')
                 
-                plt.legend()
-                plt.title('Empirical Rule Visualization')
-                st.pyplot(fig)
+                ax.legend()
+                ax.set_title('Empirical Rule Visualization')
+                show_figure(fig)
     
     elif measure == "Interquartile Range (IQR)":
-        iqr_val, steps, q1, q3 = calculate_iqr(data)
-        st.metric("IQR", f"{iqr_val:.4f}")
-        st.markdown(steps)
+        iqr_val, steps, q1, q3 = calculate_iqr(data, summary)
+        st.metric("IQR" if summary.exact_quantiles else "IQR (approximate)", f"{iqr_val:.4f}")
+        if summary.sketch is not None:
+            st.caption(f"Q1 {summary.approximation_note('q1')}")
+            st.caption(f"Q3 {summary.approximation_note('q3')}")
+        show_explanation(steps, key="variability_steps", n=summary.n)
         
         st.subheader("Outlier Detection using IQR")
-        lower_fence = q1 - 1.5 * iqr_val
-        upper_fence = q3 + 1.5 * iqr_val
-        
-        outliers = [x for x in data if x < lower_fence or x > upper_fence]
+        multiplier = st.radio(
+            "Fences:",
+            [INNER_FENCE, OUTER_FENCE],
+            format_func=lambda k: f"Inner (k = {k:g})" if k == INNER_FENCE else f"Outer (k = {k:g})",
+            horizontal=True,
+            help="Values beyond the inner fences are potential outliers, values beyond the outer fences extreme ones",
+            key="variability_fences"
+        )
+        outliers = find_outliers(data, multiplier, summary)
+        kind = "potential" if multiplier == INNER_FENCE else "extreme"
         
-        st.write(f"Lower fence: Q₁ - 1.5×IQR = {q1:.4f} - 1.5×{iqr_val:.4f} = {lower_fence:.4f}")
-        st.write(f"Upper fence: Q₃ + 1.5×IQR = {q3:.4f} + 1.5×{iqr_val:.4f} = {upper_fence:.4f}")
+        st.write(f"Lower fence: Q₁ - {multiplier:g}×IQR = {q1:.4f} - {multiplier:g}×{iqr_val:.4f} = {outliers.lower_fence:.4f}")
+        st.write(f"Upper fence: Q₃ + {multiplier:g}×IQR = {q3:.4f} + {multiplier:g}×{iqr_val:.4f} = {outliers.upper_fence:.4f}")
         
-        if outliers:
-            st.write(f"**Potential outliers:** {sorted(outliers)}")
+        if outliers.count:
+            st.write(f"**{kind.capitalize()} outliers ({outliers.count:,}):** {elide(outliers.values)}")
         else:
-            st.write("**No potential outliers detected.**")
+            st.write(f"**No {kind} outliers detected.**")
         
         st.markdown("""
         #### About the IQR
@@ -408,9 +404,9 @@ def measures_variability_tab(data):
         """)
     
     elif measure == "Coefficient of Variation (CV)":
-        cv, steps = calculate_cv(data)
+        cv, steps = calculate_cv(data, summary)
         st.metric("CV", f"{cv:.2f}%")
-        st.markdown(steps)
+        show_explanation(steps, key="variability_steps", n=summary.n)
         st.markdown("""
         #### About the Coefficient of Variation (CV)
         
@@ -0,0 +1,248 @@
+import bisect
+import os
+import re
+import sys
+import threading
+import time
+
+from modules.cache import IMAGE_CACHE, RESULT_CACHE
+
+# Port of the Prometheus endpoint served beside the app; unset leaves it off
+METRICS_PORT_ENV = "STATS_APP_METRICS_PORT"
+
+# Interface the endpoint listens on; local only unless the operator widens it (e.g. 0.0.0.0)
+METRICS_HOST = os.environ.get("STATS_APP_METRICS_HOST", "127.0.0.1")
+
+# A rerun still marked in flight after this many seconds belongs to a session that went away
+STALE_RERUN_SECONDS = 600
+
+RERUN_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RENDER_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SIZE_BUCKETS = (10, 100, 1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label set"""
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Histogram:
+    """Observations counted into cumulative buckets per label set, with their sum and count"""
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._values = {}  # labels -> [per-bucket counts (last is +Inf), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counts, _ = entry = self._values.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0])
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, total) in self._values.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    samples.append((f"{self.name}_bucket", key + (("le", _number(bound)),), cumulative))
+                samples.append((f"{self.name}_sum", key, total))
+                samples.append((f"{self.name}_count", key, cumulative))
+        return samples
+
+
+class Gauge:
+    """Value read when scraped"""
+    kind = "gauge"
+
+    def __init__(self, name, help_text, read):
+        self.name = name
+        self.help = help_text
+        self._read = read  # () -> [(labels dict, value)]
+
+    def samples(self):
+        return [(self.name, tuple(sorted(labels.items())), value) for labels, value in self._read()]
+
+
+RERUNS = Counter("stats_app_reruns_total", "Script reruns that ran to completion, by section")
+RERUN_DURATION = Histogram(
+    "stats_app_rerun_duration_seconds", "Wall time of a script rerun, by section", RERUN_BUCKETS
+)
+DATASET_SIZE = Histogram("stats_app_dataset_values", "Number of values in the dataset of each rerun", SIZE_BUCKETS)
+FIGURE_RENDER = Histogram(
+    "stats_app_figure_render_seconds", "Time to draw and encode a figure, by plot", RENDER_BUCKETS
+)
+
+# session id -> start of its rerun in progress
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+def _sessions_in_flight():
+    now = time.perf_counter()
+    with _in_flight_lock:
+        for session, start in list(_in_flight.items()):
+            if now - start > STALE_RERUN_SECONDS:
+                del _in_flight[session]
+        return [({}, len(_in_flight))]
+
+
+def _cache_requests():
+    samples = []
+    for name, cache in (("result", RESULT_CACHE), ("image", IMAGE_CACHE)):
+        samples.append(({"cache": name, "result": "hit"}, cache.hits))
+        samples.append(({"cache": name, "result": "miss"}, cache.misses))
+    return samples
+
+
+def _cache_hit_ratio():
+    return [
+        ({"cache": name}, cache.hits / (cache.hits + cache.misses) if cache.hits + cache.misses else 0.0)
+        for name, cache in (("result", RESULT_CACHE), ("image", IMAGE_CACHE))
+    ]
+
+
+def _cache_bytes():
+    return [({"cache": "result"}, RESULT_CACHE.total_bytes), ({"cache": "image"}, IMAGE_CACHE.total_bytes)]
+
+
+class _CacheRequests(Gauge):
+    # The caches count their own hits and misses, so this counter is read rather than incremented
+    kind = "counter"
+
+
+REGISTRY = [
+    RERUNS,
+    RERUN_DURATION,
+    DATASET_SIZE,
+    FIGURE_RENDER,
+    Gauge("stats_app_sessions_in_flight", "Sessions whose script is running right now", _sessions_in_flight),
+    _CacheRequests("stats_app_cache_requests_total", "Lookups in the shared caches, by cache and result", _cache_requests),
+    Gauge("stats_app_cache_hit_ratio", "Share of cache lookups that were hits since the server started", _cache_hit_ratio),
+    Gauge("stats_app_cache_bytes", "Bytes held by each shared cache", _cache_bytes),
+]
+
+
+def exposition():
+    """Every metric in the Prometheus text format (version 0.0.4)"""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{_labels(labels)} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def section_label(section):
+    """Metric label for a section title: lowercase words joined by underscores, without the emoji"""
+    return re.sub(r"[^a-z0-9]+", "_", section.lower()).strip("_") or "none"
+
+
+def _session_id():
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else threading.get_ident()
+
+
+def rerun_started():
+    """Mark this session's rerun as in flight; a rerun that was interrupted is simply replaced"""
+    with _in_flight_lock:
+        _in_flight[_session_id()] = time.perf_counter()
+
+
+def rerun_finished(section, n_values):
+    """Record the duration of this session's rerun and the size of its dataset"""
+    with _in_flight_lock:
+        start = _in_flight.pop(_session_id(), None)
+    if start is None:
+        return
+    RERUN_DURATION.observe(time.perf_counter() - start, section=section)
+    RERUNS.inc(section=section)
+    if n_values:
+        DATASET_SIZE.observe(n_values)
+
+
+def observe_render(plot, seconds):
+    FIGURE_RENDER.observe(seconds, plot=plot)
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=None):
+    """Serve /metrics on a daemon thread of this process, once; returns the server or None when off"""
+    global _server
+    port = port if port is not None else os.environ.get(METRICS_PORT_ENV)
+    if not port:
+        return None
+    with _server_lock:
+        if _server is not None:
+            return _server or None
+
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = exposition().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes every few seconds would flood the server log
+
+        try:
+            _server = ThreadingHTTPServer((METRICS_HOST, int(port)), MetricsHandler)
+        except OSError as e:
+            # Another server process already holds the port; the app runs on without an endpoint
+            print(f"Metrics endpoint not started on port {port}: {e}", file=sys.stderr)
+            _server = False
+            return None
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="metrics-endpoint", daemon=True).start()
+        return _server
@@ -0,0 +1,83 @@
+import numpy as np
+
+
+class MomentAccumulator:
+    """Running count, mean and central moment sums (M2, M3, M4) that can be updated and merged.
+
+    Each update computes the moments of the new values about their own mean and
+    folds them in with the pairwise formulas of Chan et al. and Pébay, so the
+    result stays numerically stable however the data is split into chunks.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+        self.total = 0.0
+        self.total_squares = 0.0
+        self.minimum = np.inf
+        self.maximum = -np.inf
+
+    @classmethod
+    def from_array(cls, values):
+        """Accumulator holding the moments of one array"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        accumulator = cls()
+        if len(values) == 0:
+            return accumulator
+        accumulator.n = len(values)
+        accumulator.total = float(values.sum())
+        accumulator.total_squares = float(np.dot(values, values))
+        accumulator.mean = accumulator.total / accumulator.n
+        deviations = values - accumulator.mean
+        squared = deviations * deviations
+        # Dot products avoid materializing the cubed and fourth-power deviations
+        accumulator.m2 = float(squared.sum())
+        accumulator.m3 = float(np.dot(squared, deviations))
+        accumulator.m4 = float(np.dot(squared, squared))
+        accumulator.minimum = float(values.min())
+        accumulator.maximum = float(values.max())
+        return accumulator
+
+    def update(self, values):
+        """Append one value or an array of values; costs O(1) per value added"""
+        return self.merge(MomentAccumulator.from_array(np.atleast_1d(values)))
+
+    def merge(self, other):
+        """Fold another accumulator (another chunk or worker) into this one"""
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.__dict__.update(other.__dict__)
+            return self
+
+        na, nb = self.n, other.n
+        n = na + nb
+        delta = other.mean - self.mean
+        delta_n = delta / n
+        delta_n2 = delta_n * delta_n
+        term = delta * delta_n * na * nb
+
+        m4 = (
+            self.m4 + other.m4
+            + term * delta_n2 * (na * na - na * nb + nb * nb)
+            + 6 * delta_n2 * (na * na * other.m2 + nb * nb * self.m2)
+            + 4 * delta_n * (na * other.m3 - nb * self.m3)
+        )
+        m3 = (
+            self.m3 + other.m3
+            + term * delta_n * (na - nb)
+            + 3 * delta_n * (na * other.m2 - nb * self.m2)
+        )
+        self.m2 = self.m2 + other.m2 + term
+        self.m3 = m3
+        self.m4 = m4
+        self.mean = self.mean + delta_n * nb
+        self.n = n
+        self.total += other.total
+        self.total_squares += other.total_squares
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        return self
@@ -0,0 +1,82 @@
+import numpy as np
+from dataclasses import dataclass
+
+from modules.stats_engine import describe, iter_blocks
+from modules.cache import cached
+from modules.profiling import timed
+
+# IQR multipliers of Tukey's inner fences (potential outliers) and outer fences (extreme outliers)
+INNER_FENCE = 1.5
+OUTER_FENCE = 3.0
+
+
+@dataclass(frozen=True)
+class Outliers:
+    """Values beyond the fences Q1 - k·IQR and Q3 + k·IQR, and the whisker ends within them"""
+    multiplier: float
+    lower_fence: float
+    upper_fence: float
+    below: np.ndarray  # Sorted values under the lower fence
+    above: np.ndarray  # Sorted values over the upper fence
+    whisker_low: float  # Smallest value inside the fences
+    whisker_high: float  # Largest value inside the fences
+
+    @property
+    def values(self):
+        """Every outlier, in ascending order"""
+        return np.concatenate((self.below, self.above))
+
+    @property
+    def count(self):
+        return len(self.below) + len(self.above)
+
+
+def fences(summary, multiplier=INNER_FENCE):
+    """Lower and upper fences from the summary's quartiles"""
+    return summary.q1 - multiplier * summary.iqr, summary.q3 + multiplier * summary.iqr
+
+
+def outlier_mask(values, lower_fence, upper_fence):
+    """Boolean mask of the values outside the fences"""
+    return (values < lower_fence) | (values > upper_fence)
+
+
+@timed("statistics")
+@cached
+def find_outliers(data, multiplier=INNER_FENCE, summary=None):
+    """Locate the values beyond the fences.
+
+    In memory the outliers are a prefix and a suffix of the cached sorted array,
+    found with two binary searches. Memory-mapped data are scanned block by block.
+    """
+    if summary is None:
+        summary = describe(data)
+    lower_fence, upper_fence = fences(summary, multiplier)
+
+    if not summary.out_of_core:
+        sorted_values = summary.sorted_values
+        start = np.searchsorted(sorted_values, lower_fence, side="left")
+        stop = np.searchsorted(sorted_values, upper_fence, side="right")
+        # The quartiles lie inside the fences, so start < stop
+        return Outliers(
+            multiplier, lower_fence, upper_fence,
+            sorted_values[:start], sorted_values[stop:],
+            float(sorted_values[start]), float(sorted_values[stop - 1]),
+        )
+
+    below, above = [], []
+    whisker_low, whisker_high = np.inf, -np.inf
+    for block in iter_blocks(summary.values):
+        mask = outlier_mask(block, lower_fence, upper_fence)
+        outside = block[mask]
+        below.append(outside[outside < lower_fence])
+        above.append(outside[outside > upper_fence])
+        inside = block[~mask]
+        if len(inside):
+            whisker_low = min(whisker_low, float(inside.min()))
+            whisker_high = max(whisker_high, float(inside.max()))
+    return Outliers(
+        multiplier, lower_fence, upper_fence,
+        np.sort(np.concatenate(below)), np.sort(np.concatenate(above)),
+        whisker_low, whisker_high,
+    )
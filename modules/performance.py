@@ -0,0 +1,62 @@
+import streamlit as st
+
+from modules.profiling import chrome_trace, profiling_enabled, self_time_by_category
+
+# Reruns of a session kept for the trace download
+TRACE_HISTORY = 20
+
+CATEGORY_LABELS = {
+    "rerun": "Script and layout",
+    "input": "Data input",
+    "section": "Section widgets and text",
+    "statistics": "Statistics",
+    "format": "Step formatting",
+    "plot": "Drawing figures",
+    "encode": "PNG encoding",
+    "send": "Sending elements",
+}
+
+
+def profiling_requested():
+    """Profiling is on for every session, or this session opened the app with ?profile=1"""
+    return profiling_enabled() or st.query_params.get("profile") == "1"
+
+
+def performance_panel(spans):
+    """Sidebar breakdown of the rerun that just finished, with a Chrome trace download"""
+    import pandas as pd
+
+    history = st.session_state.setdefault("performance_traces", [])
+    history.append(spans)
+    del history[:-TRACE_HISTORY]
+
+    total = spans[0]["end"] - spans[0]["start"]
+    with st.sidebar.expander("⏱️ Performance", expanded=True):
+        st.metric("Last rerun", f"{total * 1000:.1f} ms")
+
+        # Self time per category, so nested spans are not counted twice
+        totals = sorted(self_time_by_category(spans).items(), key=lambda item: -item[1])
+        st.dataframe(pd.DataFrame({
+            "Where": [CATEGORY_LABELS.get(category, category) for category, _ in totals],
+            "ms": [seconds * 1000 for _, seconds in totals],
+            "Share": [f"{seconds / total:.0%}" for _, seconds in totals],
+        }), hide_index=True, use_container_width=True)
+
+        st.dataframe(pd.DataFrame({
+            "Span": ["· " * s["depth"] + s["name"] for s in spans],
+            "Total ms": [(s["end"] - s["start"]) * 1000 for s in spans],
+            "Self ms": [s["self"] * 1000 for s in spans],
+            "Notes": [", ".join(f"{k}: {v}" for k, v in s["args"].items()) for s in spans],
+        }), hide_index=True, use_container_width=True)
+        st.caption(
+            "Sending covers serializing elements into the page; the network transfer "
+            "happens after the rerun and is not part of it."
+        )
+
+        st.download_button(
+            "Download Chrome trace",
+            chrome_trace(history),
+            file_name="stats-app-trace.json",
+            mime="application/json",
+            help=f"Spans of the last {len(history)} reruns; open in chrome://tracing or ui.perfetto.dev",
+        )
@@ -0,0 +1,118 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Set to 1 to instrument every session; a single session can opt in with ?profile=1
+PROFILE_ENV = "STATS_APP_PROFILE"
+
+# Spans of the rerun running on this thread; every session reruns its script on its own thread
+_local = threading.local()
+
+
+def profiling_enabled():
+    """True when the server was started with profiling on for every session"""
+    return os.environ.get(PROFILE_ENV, "") not in ("", "0")
+
+
+def start_trace(name="rerun"):
+    """Start recording spans on this thread, dropping any trace an interrupted rerun left behind"""
+    _local.spans = []
+    _local.stack = []
+    _open(name, "rerun")
+
+
+def finish_trace():
+    """Stop recording and return this thread's spans, outermost first"""
+    spans = getattr(_local, "spans", None)
+    if spans is None:
+        return []
+    while _local.stack:
+        _close()
+    _local.spans = None
+    return spans
+
+
+def tracing():
+    return getattr(_local, "spans", None) is not None
+
+
+def _open(name, category):
+    span = {
+        "name": name, "cat": category, "start": time.perf_counter(),
+        "depth": len(_local.stack), "tid": threading.get_ident(), "args": {},
+    }
+    _local.spans.append(span)
+    _local.stack.append([span, 0.0])  # The span and the time spent in its children
+
+
+def _close():
+    span, children = _local.stack.pop()
+    span["end"] = time.perf_counter()
+    duration = span["end"] - span["start"]
+    span["self"] = duration - children
+    if _local.stack:
+        _local.stack[-1][1] += duration
+
+
+@contextmanager
+def span(name, category):
+    """Time the enclosed block as a span; costs one attribute lookup when no trace is recording"""
+    if not tracing():
+        yield
+        return
+    _open(name, category)
+    try:
+        yield
+    finally:
+        _close()
+
+
+def note(**args):
+    """Attach details (cache hit, bytes sent, ...) to the innermost open span"""
+    if tracing() and _local.stack:
+        _local.stack[-1][0]["args"].update(args)
+
+
+def timed(category):
+    """Record each call of the function as a span of this category while a trace is recording"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracing():
+                return func(*args, **kwargs)
+            with span(func.__name__, category):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def self_time_by_category(spans):
+    """Seconds spent in each category, counting nested spans only once"""
+    totals = {}
+    for s in spans:
+        totals[s["cat"]] = totals.get(s["cat"], 0.0) + s["self"]
+    return totals
+
+
+def chrome_trace(traces):
+    """Chrome trace event JSON (chrome://tracing, Perfetto) of one or more reruns' spans"""
+    pid = os.getpid()
+    events = []
+    for spans in traces:
+        for s in spans:
+            events.append({
+                "name": s["name"],
+                "cat": s["cat"],
+                "ph": "X",
+                "ts": s["start"] * 1e6,
+                "dur": (s["end"] - s["start"]) * 1e6,
+                "pid": pid,
+                "tid": s["tid"],
+                "args": s["args"],
+            })
+    return json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
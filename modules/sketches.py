@@ -0,0 +1,149 @@
+import numpy as np
+
+
+class KLLSketch:
+    """Mergeable quantile sketch (Karnin, Lang & Liberty) with bounded memory.
+
+    Values are kept in a hierarchy of compactors; an item at level h stands
+    for 2**h original values. When a level overflows it is sorted and every
+    other item (from a random offset) is promoted to the level above. Memory
+    stays O(k log(n / k)) and the rank error is about `rank_error` * n.
+    """
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0, dtype=np.float64)]
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def rank_error(self):
+        """Normalized rank error bound for a single quantile (99% confidence, DataSketches' fit)"""
+        return 2.296 / self.k ** 0.9723
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0, dtype=np.float64))
+                items = np.sort(items)
+                # An odd item out stays behind so the promoted half has even weight
+                keep = items[:len(items) % 2]
+                items = items[len(items) % 2:]
+                promoted = items[self._rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate((self.levels[level + 1], promoted))
+            level += 1
+
+    def update(self, values):
+        """Add one value or an array of values"""
+        values = np.atleast_1d(np.asarray(values, dtype=np.float64)).ravel()
+        self.n += len(values)
+        self.levels[0] = np.concatenate((self.levels[0], values))
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """Fold another sketch (another chunk or process) into this one"""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, dtype=np.float64))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate((self.levels[level], items))
+        self.n += other.n
+        self._compress()
+        return self
+
+    @property
+    def size(self):
+        """Number of items retained by the sketch"""
+        return sum(len(items) for items in self.levels)
+
+    def _weighted_items(self):
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        return values[order], np.cumsum(weights[order])
+
+    def values_at(self, ranks):
+        """Approximate values at an array of 0-based ranks of the sorted data"""
+        values, cumulative = self._weighted_items()
+        # Compaction preserves total weight, so cumulative weights are ranks out of n
+        index = np.searchsorted(cumulative, np.asarray(ranks) + 1, side="left")
+        return values[np.minimum(index, len(values) - 1)]
+
+    def value_at(self, rank):
+        """Approximate value at a 0-based rank of the sorted data"""
+        return float(self.values_at(rank))
+
+    def quantile(self, q):
+        """Approximate q-th quantile (0 <= q <= 1)"""
+        return self.value_at(min(max(int(q * self.n), 0), self.n - 1))
+
+
+class MisraGries:
+    """Mergeable heavy-hitter summary (Misra & Gries) with at most k counters.
+
+    Every estimated count is a lower bound on the true count, and falls short
+    of it by at most `error_bound` (never more than n / (k + 1)). Values that
+    are not tracked occur at most `error_bound` times.
+    """
+
+    def __init__(self, k=100):
+        self.k = k
+        self.n = 0
+        self.error_bound = 0
+        self.keys = np.empty(0, dtype=np.float64)
+        self.counts = np.empty(0, dtype=np.int64)
+
+    def _add(self, keys, counts):
+        merged, inverse = np.unique(np.concatenate((self.keys, keys)), return_inverse=True)
+        counts = np.bincount(inverse, weights=np.concatenate((self.counts, counts))).astype(np.int64)
+        if len(counts) > self.k:
+            # Subtract the (k+1)-th largest count from every counter and drop the non-positive ones
+            threshold = np.partition(counts, len(counts) - self.k - 1)[len(counts) - self.k - 1]
+            counts -= threshold
+            keep = counts > 0
+            merged, counts = merged[keep], counts[keep]
+            self.error_bound += int(threshold)
+        self.keys, self.counts = merged, counts
+
+    def update(self, values):
+        """Add one value or an array of values"""
+        values = np.atleast_1d(np.asarray(values, dtype=np.float64)).ravel()
+        keys, counts = np.unique(values, return_counts=True)
+        self.n += len(values)
+        self._add(keys, counts)
+        return self
+
+    def merge(self, other):
+        """Fold another summary (another chunk or process) into this one"""
+        self.n += other.n
+        self.error_bound += other.error_bound
+        self._add(other.keys, other.counts)
+        return self
+
+    def top_k(self, m):
+        """The m values with the largest estimated counts, most frequent first"""
+        order = np.lexsort((self.keys, -self.counts))[:m]
+        return self.keys[order], self.counts[order]
+
+    def modes(self):
+        """Mode candidates and whether they are guaranteed to be the true modes"""
+        if len(self.counts) == 0:
+            return [], True
+        best = self.counts.max()
+        candidates = self.keys[self.counts == best]
+        if self.error_bound == 0:
+            # Nothing was ever evicted, so every count is exact
+            return candidates.tolist(), True
+        # The runner-up is the second counter, tied or not; untracked values count as up to error_bound
+        runner_up = np.partition(self.counts, -2)[-2] if len(self.counts) > 1 else 0
+        # One clear leader that no other value can catch up with, even with the maximum undercount
+        guaranteed = best > runner_up + self.error_bound
+        return candidates.tolist(), bool(guaranteed)
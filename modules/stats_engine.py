@@ -0,0 +1,431 @@
+import numpy as np
+from dataclasses import dataclass, field
+from functools import cached_property
+
+from modules.cache import RESULT_CACHE, cached
+from modules.moments import MomentAccumulator
+from modules.sketches import KLLSketch, MisraGries
+from modules.profiling import timed
+
+# Values processed at a time when a dataset is memory-mapped rather than held in RAM
+BLOCK_SIZE = 1 << 20
+
+# Histogram bins per refinement pass of the out-of-core order statistic search
+SELECTION_BINS = 4096
+
+# Candidates that may be gathered into memory to finish an out-of-core selection
+GATHER_LIMIT = 1 << 22
+
+# Memory-mapped datasets above this size report sketch quantiles instead of exact ones
+EXACT_QUANTILE_LIMIT = 50_000_000
+
+# Counters kept by the heavy-hitter summary; estimated counts are within n / (k + 1)
+HEAVY_HITTER_COUNTERS = 1000
+
+
+def is_out_of_core(values):
+    """True when the dataset lives on disk (memory-mapped) and must be read in blocks"""
+    return isinstance(values, np.memmap)
+
+
+def iter_blocks(values, block_size=BLOCK_SIZE):
+    """Yield consecutive float64 blocks of a (possibly memory-mapped) array"""
+    for start in range(0, len(values), block_size):
+        yield np.asarray(values[start:start + block_size], dtype=np.float64)
+
+
+def _position_ranks(n, p):
+    """0-based ranks and interpolation fraction of the textbook (n+1)p position"""
+    position = p * (n + 1)
+    # Positions outside [1, n] (tiny samples) are clamped to the extremes
+    position = min(max(position, 1), n)
+    pos_int = int(position)
+    pos_frac = position - pos_int
+    return pos_int - 1, min(pos_int, n - 1), pos_frac
+
+
+def _percentile_ranks(n, q):
+    """0-based ranks and interpolation fraction of numpy's default (linear) percentile rule"""
+    h = (n - 1) * q / 100
+    lower = int(np.floor(h))
+    return lower, min(lower + 1, n - 1), h - lower
+
+
+def _interpolate(value_at, ranks):
+    lower_rank, upper_rank, fraction = ranks
+    lower_value = value_at(lower_rank)
+    if fraction == 0:
+        return float(lower_value)
+    upper_value = value_at(upper_rank)
+    return float(lower_value + fraction * (upper_value - lower_value))
+
+
+def _blocked_order_statistics(values, ranks, minimum, maximum):
+    """Exact order statistics of a memory-mapped array by histogram refinement.
+
+    Each pass histograms the values inside every interval that still holds a
+    wanted rank, then narrows the interval to the bin containing that rank.
+    Once an interval holds few enough values they are gathered and partitioned.
+    """
+    # Interval state: [lo, hi) (or [lo, hi] when closed), values below lo, values inside
+    pending = {int(rank): (minimum, maximum, True, 0, len(values)) for rank in set(ranks)}
+    found = {}
+    while pending:
+        intervals = sorted(set(pending.values()))
+        edges = [np.unique(np.linspace(lo, hi, SELECTION_BINS + 1)) for lo, hi, _, _, _ in intervals]
+        gather = [count <= GATHER_LIMIT or len(e) < 3 for (_, _, _, _, count), e in zip(intervals, edges)]
+        counts = [np.zeros(max(len(e) - 1, 1), dtype=np.int64) for e in edges]
+        gathered = [[] for _ in intervals]
+        low = [np.inf] * len(intervals)
+        high = [-np.inf] * len(intervals)
+
+        for block in iter_blocks(values):
+            for i, (lo, hi, closed, _, _) in enumerate(intervals):
+                inside = (block >= lo) & ((block < hi) | (closed & (block == hi)))
+                selected = block[inside]
+                if len(selected) == 0:
+                    continue
+                low[i] = min(low[i], selected.min())
+                high[i] = max(high[i], selected.max())
+                if gather[i]:
+                    gathered[i].append(selected)
+                else:
+                    bins = np.searchsorted(edges[i], selected, side="right") - 1
+                    np.minimum(bins, len(edges[i]) - 2, out=bins)
+                    counts[i] += np.bincount(bins, minlength=len(edges[i]) - 1)
+
+        next_pending = {}
+        for i, interval in enumerate(intervals):
+            _, _, closed, below, _ = interval
+            ranks_in = [rank for rank, state in pending.items() if state == interval]
+            if low[i] == high[i]:
+                # Every value left in the interval is the same
+                for rank in ranks_in:
+                    found[rank] = float(low[i])
+            elif gather[i]:
+                candidates = np.concatenate(gathered[i])
+                local_ranks = [rank - below for rank in ranks_in]
+                candidates.partition(local_ranks)
+                for rank, local_rank in zip(ranks_in, local_ranks):
+                    found[rank] = float(candidates[local_rank])
+            else:
+                cumulative = below + np.cumsum(counts[i])
+                for rank in ranks_in:
+                    b = int(np.searchsorted(cumulative, rank, side="right"))
+                    next_pending[rank] = (
+                        float(edges[i][b]),
+                        float(edges[i][b + 1]),
+                        bool(closed and b == len(counts[i]) - 1),
+                        int(cumulative[b - 1]) if b > 0 else below,
+                        int(counts[i][b]),
+                    )
+        pending = next_pending
+    return found
+
+
+def mode_type(n_modes):
+    """Name of a distribution with this many modes"""
+    if n_modes == 0:
+        return "No mode"
+    if n_modes == 1:
+        return "Unimodal"
+    if n_modes == 2:
+        return "Bimodal"
+    return "Multimodal"
+
+
+def heavy_hitter_modes(heavy_hitters):
+    """Modes estimated from a Misra-Gries summary: (values, estimated count, guaranteed)"""
+    candidates, guaranteed = heavy_hitters.modes()
+    _, counts = heavy_hitters.top_k(1)
+    max_count = int(counts[0]) if len(counts) else 0
+    # Only report a mode once some value is known to repeat
+    return (candidates if max_count > 1 else []), max_count, guaranteed
+
+
+def _zero_fp_noise(m):
+    # Treat floating point noise as an exact zero, as pandas does for skew/kurtosis only
+    return 0.0 if abs(m) < 1e-14 else m
+
+
+def format_value(x):
+    """Format a data value for display, dropping the trailing .0 of whole numbers"""
+    x = float(x)
+    return str(int(x)) if x.is_integer() else str(x)
+
+
+class accounted_property(cached_property):
+    """cached_property whose value, once stored, is added to the summary's size in the result cache"""
+
+    def __get__(self, instance, owner=None):
+        value = super().__get__(instance, owner)
+        if instance is not None:
+            RESULT_CACHE.resize(instance)
+        return value
+
+
+@dataclass(frozen=True)
+class DescriptiveStats:
+    """Summary statistics of a dataset, shared by every tab"""
+    values: np.ndarray
+    n: int
+    total: float
+    total_squares: float
+    mean: float
+    m2: float  # Sums of the 2nd, 3rd and 4th powers of the deviations from the mean
+    m3: float
+    m4: float
+    minimum: float
+    maximum: float
+    median: float
+    q1: float
+    q3: float
+    p10: float
+    p90: float
+    order_statistics: dict = field(default_factory=dict)  # rank -> value of every selected rank
+    sketch: KLLSketch = None  # Quantile sketch built while streaming memory-mapped data
+    exact_quantiles: bool = True
+    histograms: dict = field(default_factory=dict)  # bin count -> (counts, edges), filled on demand
+
+    @property
+    def out_of_core(self):
+        return is_out_of_core(self.values)
+
+    @accounted_property
+    def sorted_values(self):
+        """Fully sorted data, only computed when a view needs it (None when memory-mapped)"""
+        if self.out_of_core:
+            return None
+        return np.sort(self.values)
+
+    def value_at(self, rank):
+        """Value at a 0-based rank of the sorted data"""
+        if rank in self.order_statistics:
+            return self.order_statistics[rank]
+        if self.out_of_core:
+            return self.sketch.value_at(rank)
+        return float(self.sorted_values[rank])
+
+    def values_at(self, ranks):
+        """Values at an array of 0-based ranks, estimated from the sketch when memory-mapped"""
+        if self.out_of_core:
+            return self.sketch.values_at(ranks)
+        return self.sorted_values[ranks]
+
+    @cached_property
+    def sketch_quantiles(self):
+        """Median, quartiles and 10th/90th percentiles read from the sketch, if there is one"""
+        if self.sketch is None:
+            return None
+        value_at = self.sketch.value_at
+        return {
+            "median": _interpolate(value_at, _position_ranks(self.n, 0.5)),
+            "q1": _interpolate(value_at, _position_ranks(self.n, 0.25)),
+            "q3": _interpolate(value_at, _position_ranks(self.n, 0.75)),
+            "p10": _interpolate(value_at, _percentile_ranks(self.n, 10)),
+            "p90": _interpolate(value_at, _percentile_ranks(self.n, 90)),
+        }
+
+    def approximation_note(self, name):
+        """One-line description of the sketch estimate of a quantile, for display next to it"""
+        if self.sketch is None:
+            return None
+        note = (
+            f"≈ {self.sketch_quantiles[name]:.4f} from a KLL sketch of {self.sketch.size:,} retained values "
+            f"(rank error within ±{self.sketch.rank_error:.2%} with 99% confidence)"
+        )
+        if not self.exact_quantiles:
+            note += f". The exact value is not computed for more than {EXACT_QUANTILE_LIMIT:,} values."
+        return note
+
+    @accounted_property
+    def frequencies(self):
+        """Distinct values and how often each occurs"""
+        if not self.out_of_core:
+            starts = np.concatenate(([0], np.flatnonzero(np.diff(self.sorted_values)) + 1))
+            return self.sorted_values[starts], np.diff(np.append(starts, self.n))
+        distinct = np.empty(0, dtype=np.float64)
+        counts = np.empty(0, dtype=np.int64)
+        for block in iter_blocks(self.values):
+            block_distinct, block_counts = np.unique(block, return_counts=True)
+            merged, inverse = np.unique(np.concatenate((distinct, block_distinct)), return_inverse=True)
+            counts = np.bincount(inverse, weights=np.concatenate((counts, block_counts)))
+            distinct, counts = merged, counts.astype(np.int64)
+        return distinct, counts
+
+    def histogram(self, bins):
+        """Counts and edges of `bins` equal-width bins over the data range, as np.histogram computes them"""
+        if bins not in self.histograms:
+            low, high = self.minimum, self.maximum
+            if low == high:
+                low, high = low - 0.5, high + 0.5
+            edges = np.linspace(low, high, bins + 1)
+            if self.out_of_core:
+                counts = np.zeros(bins, dtype=np.int64)
+                for block in iter_blocks(self.values):
+                    counts += np.histogram(block, bins=bins, range=(low, high))[0]
+            else:
+                # Values below each edge, read off the sorted data; the last bin is closed
+                below = np.searchsorted(self.sorted_values, edges, side="left")
+                below[-1] = self.n
+                counts = np.diff(below)
+            self.histograms[bins] = (counts, edges)
+            RESULT_CACHE.resize(self)
+        return self.histograms[bins]
+
+    @accounted_property
+    def heavy_hitters(self):
+        """Misra-Gries summary of the most frequent values, built block by block in bounded memory"""
+        summary = MisraGries(k=HEAVY_HITTER_COUNTERS)
+        for block in iter_blocks(self.values):
+            summary.update(block)
+        return summary
+
+    @property
+    def distinct_values(self):
+        return self.frequencies[0]
+
+    @property
+    def counts(self):
+        return self.frequencies[1]
+
+    @property
+    def range(self):
+        return self.maximum - self.minimum
+
+    @property
+    def iqr(self):
+        return self.q3 - self.q1
+
+    @property
+    def max_count(self):
+        return int(self.counts.max())
+
+    @property
+    def mode_values(self):
+        if self.max_count == 1:
+            return []
+        return self.distinct_values[self.counts == self.max_count].tolist()
+
+    @property
+    def mode_type(self):
+        return mode_type(len(self.mode_values))
+
+    def variance(self, is_population=False):
+        divisor = self.n if is_population else self.n - 1
+        return self.m2 / divisor if divisor > 0 else float("nan")
+
+    def std_dev(self, is_population=False):
+        return float(np.sqrt(self.variance(is_population)))
+
+    @property
+    def cv(self):
+        """Coefficient of variation (%) based on the sample standard deviation"""
+        return float(np.float64(self.std_dev()) / self.mean * 100)
+
+    @property
+    def skewness(self):
+        """Adjusted Fisher-Pearson skewness, matching pandas.Series.skew"""
+        n = self.n
+        if n < 3:
+            return float("nan")
+        m2, m3 = _zero_fp_noise(self.m2), _zero_fp_noise(self.m3)
+        if m2 == 0:
+            return 0.0
+        return n * (n - 1) ** 0.5 / (n - 2) * (m3 / m2 ** 1.5)
+
+    @property
+    def kurtosis(self):
+        """Excess kurtosis with the unbiased estimator, matching pandas.Series.kurtosis"""
+        n = self.n
+        if n < 4:
+            return float("nan")
+        m2, m4 = _zero_fp_noise(self.m2), _zero_fp_noise(self.m4)
+        if m2 == 0:
+            return 0.0
+        adjustment = 3 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+        numerator = n * (n + 1) * (n - 1) * m4
+        denominator = (n - 2) * (n - 3) * m2 ** 2
+        return numerator / denominator - adjustment
+
+
+def _needed_ranks(n):
+    """0-based ranks of every order statistic the summary interpolates between"""
+    ranks = []
+    for p in (0.25, 0.5, 0.75):
+        ranks.extend(_position_ranks(n, p)[:2])
+    for q in (10, 90):
+        ranks.extend(_percentile_ranks(n, q)[:2])
+    return ranks
+
+
+@timed("statistics")
+@cached
+def _non_finite_message(n_invalid):
+    return f"The data contains {n_invalid:,} missing (NaN) or infinite values; remove them first"
+
+
+def describe(data):
+    """Compute every descriptive statistic of the dataset, block by block when it is memory-mapped"""
+    if is_out_of_core(data):
+        values = data.reshape(-1)
+    else:
+        values = np.asarray(data, dtype=np.float64).ravel()
+    n = len(values)
+    if n == 0:
+        raise ValueError("Cannot describe an empty dataset")
+
+    if is_out_of_core(values):
+        # A single pass over the file feeds the moments and the quantile sketch
+        moments = MomentAccumulator()
+        sketch = KLLSketch(seed=0)  # Seeded so reruns report the same estimates
+        n_invalid = 0
+        for block in iter_blocks(values):
+            n_invalid += len(block) - int(np.count_nonzero(np.isfinite(block)))
+            moments.merge(MomentAccumulator.from_array(block))
+            sketch.update(block)
+        if n_invalid:
+            # Every later pass (order statistics, histograms, frequencies) assumes finite, comparable values
+            raise ValueError(_non_finite_message(n_invalid))
+        exact_quantiles = n <= EXACT_QUANTILE_LIMIT
+        if exact_quantiles:
+            order_statistics = _blocked_order_statistics(
+                values, _needed_ranks(n), moments.minimum, moments.maximum
+            )
+            value_at = order_statistics.__getitem__
+        else:
+            order_statistics = {}
+            value_at = sketch.value_at
+    else:
+        n_invalid = n - int(np.count_nonzero(np.isfinite(values)))
+        if n_invalid:
+            raise ValueError(_non_finite_message(n_invalid))
+        moments = MomentAccumulator.from_array(values)
+        # One O(n) selection places every needed rank, instead of a full sort
+        ranks = sorted(set(_needed_ranks(n)))
+        partitioned = np.partition(values, ranks)
+        order_statistics = {rank: float(partitioned[rank]) for rank in ranks}
+        value_at = order_statistics.__getitem__
+        sketch = None
+        exact_quantiles = True
+
+    return DescriptiveStats(
+        values=values,
+        n=n,
+        total=moments.total,
+        total_squares=moments.total_squares,
+        mean=moments.mean,
+        m2=moments.m2,
+        m3=moments.m3,
+        m4=moments.m4,
+        minimum=moments.minimum,
+        maximum=moments.maximum,
+        median=_interpolate(value_at, _position_ranks(n, 0.5)),
+        q1=_interpolate(value_at, _position_ranks(n, 0.25)),
+        q3=_interpolate(value_at, _position_ranks(n, 0.75)),
+        p10=_interpolate(value_at, _percentile_ranks(n, 10)),
+        p90=_interpolate(value_at, _percentile_ranks(n, 90)),
+        order_statistics=order_statistics,
+        sketch=sketch,
+        exact_quantiles=exact_quantiles,
+    )
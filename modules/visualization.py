@@ -1,28 +1,61 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from scipy import stats
-from modules.measures_variability import calculate_iqr
+from modules.stats_engine import describe, iter_blocks
+from modules.cache import cached
+from modules.figures import new_figure, show_plot
+from modules.kde import binned_kde
+from modules.outliers import INNER_FENCE, OUTER_FENCE, find_outliers
+from modules.profiling import timed
 
-def plot_histogram(data, bins='auto', kde=True):
+# Larger datasets draw this many order statistics in the normal probability plot instead of all
+PROBPLOT_POINTS = 2000
+
+# Order statistics always drawn at each end of a thinned normal probability plot
+PROBPLOT_TAIL_POINTS = 50
+
+# Stems a stem-and-leaf plot spans at most (10 log10 n for smaller samples); wider data get a coarser leaf unit
+STEM_LEAF_MAX_STEMS = 50
+
+# Finest leaf unit of a stem-and-leaf plot, in decimal places
+STEM_LEAF_MAX_DECIMALS = 6
+
+# Lines with more leaves than this show a count per leaf digit
+STEM_LEAF_MAX_LEAVES = 40
+
+# Tukey's markers for the lines of a split stem
+STEM_LINE_MARKERS = {1: [""], 2: ["*", "."], 5: ["*", "t", "f", "s", "."]}
+
+@timed("plot")
+def plot_histogram(data, bins='auto', kde=True, summary=None):
     """Create a histogram with optional kernel density estimation"""
-    fig, ax = plt.subplots(figsize=(10, 6))
+    import seaborn as sns
+    
+    if summary is None:
+        summary = describe(data)
+    fig, ax = new_figure(figsize=(10, 6))
     
     # Calculate bin edges if 'auto'
     if bins == 'auto':
-        if len(data) < 20:
-            bins = min(int(np.sqrt(len(data))), 10)
+        if summary.n < 20:
+            bins = min(int(np.sqrt(summary.n)), 10)
+        elif summary.range == 0:
+            bins = 1
         else:
-            bins = 'sturges'  # Use Sturges' formula for bin count
+            bins = int(np.ceil(np.log2(summary.n) + 1))  # Sturges' formula for bin count
     
-    # Plot histogram
-    sns.histplot(data, bins=bins, kde=kde, ax=ax)
+    # Plot the histogram from precomputed bin counts instead of the raw data
+    counts, edges = summary.histogram(bins)
+    sns.histplot(x=edges[:-1], weights=counts, bins=edges.tolist(), ax=ax)
+    
+    if kde and summary.n > 1 and summary.range > 0:
+        # Density scaled to counts, as seaborn draws it over a count histogram
+        grid, density = binned_kde(summary.values, summary=summary)
+        ax.plot(grid, density * summary.n * (edges[1] - edges[0]), color=ax.patches[0].get_facecolor()[:3])
     
     # Add mean and median lines
-    mean_val = np.mean(data)
-    median_val = np.median(data)
+    mean_val = summary.mean
+    median_val = summary.median
     
     ax.axvline(mean_val, color='red', linestyle='--', linewidth=2, label=f'Mean: {mean_val:.2f}')
     ax.axvline(median_val, color='green', linestyle=':', linewidth=2, label=f'Median: {median_val:.2f}')
@@ -35,12 +68,22 @@ def plot_histogram(data, bins='auto', kde=True):
     
     return fig
 
-def plot_boxplot(data):
+
+@timed("plot")
+def plot_boxplot(data, multiplier=INNER_FENCE, summary=None):
     """Create a box plot with annotations for key components"""
-    fig, ax = plt.subplots(figsize=(10, 6))
-    
-    # Create box plot
-    bp = ax.boxplot(data, patch_artist=True, vert=False)
+    if summary is None:
+        summary = describe(data)
+    outliers = find_outliers(data, multiplier, summary)
+    fig, ax = new_figure(figsize=(10, 6))
+    
+    # Draw the box from the same quartiles and fences as the rest of the app
+    box = {
+        'med': summary.median, 'q1': summary.q1, 'q3': summary.q3,
+        'whislo': outliers.whisker_low, 'whishi': outliers.whisker_high,
+        'fliers': outliers.values,
+    }
+    bp = ax.bxp([box], patch_artist=True, vert=False)
     
     # Customize box plot appearance
     for patch in bp['boxes']:
@@ -59,12 +102,12 @@ def plot_boxplot(data):
         flier.set_markeredgecolor('black')
         flier.set_markersize(8)
     
-    # Calculate five-number summary for annotations
-    min_val = min(data)
-    q1, q3 = np.percentile(data, [25, 75])
-    median_val = np.median(data)
-    max_val = max(data)
-    iqr = q3 - q1
+    # Five-number summary for annotations
+    min_val = summary.minimum
+    q1, q3 = summary.q1, summary.q3
+    median_val = summary.median
+    max_val = summary.maximum
+    iqr = summary.iqr
     
     # Add annotations
     ax.set_title('Box Plot of Data', fontsize=14)
@@ -88,10 +131,7 @@ def plot_boxplot(data):
         verticalalignment='top'
     )
     
-    # Check for outliers and mark them
-    lower_fence = q1 - 1.5 * iqr
-    upper_fence = q3 + 1.5 * iqr
-    outliers = [x for x in data if x < lower_fence or x > upper_fence]
+    lower_fence, upper_fence = outliers.lower_fence, outliers.upper_fence
     
     # Add outlier zone indicators
     if min_val < lower_fence:
@@ -133,78 +173,187 @@ def plot_boxplot(data):
     
     return fig
 
-def plot_stem_and_leaf(data):
-    """Create a stem and leaf plot"""
-    # Convert data to integers for simplified display
-    factor = 1
-    if all(x == int(x) for x in data):
-        # Data is already integers
-        stem_factor = 10
-        leaf_factor = 1
-    else:
-        # Find a good scaling factor
-        max_decimals = max([len(str(x).split('.')[-1]) if '.' in str(x) else 0 for x in data])
-        stem_factor = 10
-        leaf_factor = 10 ** max_decimals
-        data = [round(x * leaf_factor) for x in data]
-    
-    # Create stems and leaves
-    stems = {}
-    for value in sorted(data):
-        stem = value // stem_factor
-        leaf = value % stem_factor
-        
-        if stem not in stems:
-            stems[stem] = []
-        stems[stem].append(leaf)
+def _leaf_decimals(values, max_decimals=STEM_LEAF_MAX_DECIMALS):
+    """Fewest decimal places that represent every value exactly, or one more than the maximum"""
+    decimals = 0
+    for block in iter_blocks(values):
+        while decimals <= max_decimals:
+            scaled = block * 10.0 ** decimals
+            if np.all(np.abs(scaled - np.rint(scaled)) <= 1e-9 * np.maximum(np.abs(scaled), 1.0)):
+                break
+            decimals += 1
+        if decimals > max_decimals:
+            break
+    return decimals
+
+@timed("plot")
+@cached
+def plot_stem_and_leaf(data, lines_per_stem=1, max_leaves=STEM_LEAF_MAX_LEAVES, summary=None):
+    """Create a stem and leaf plot.
+
+    Values are cut into integer stems and leaves in leaf units, and the leaves
+    are counted per line with one bincount per block, so the cost is one pass
+    over the data plus the text that is shown. A stem can be split over 2 or 5
+    lines. Lines with more than `max_leaves` leaves list a count per leaf digit
+    instead of every leaf.
+    """
+    if summary is None:
+        summary = describe(data)
+    
+    # Leaf unit: the data's own precision, coarsened until the stems fit on screen
+    exponent = -min(_leaf_decimals(data), STEM_LEAF_MAX_DECIMALS)
+    max_stems = min(max(10 * np.log10(summary.n), 10), STEM_LEAF_MAX_STEMS)
+    if summary.range > 0:
+        exponent = max(exponent, int(np.ceil(np.log10(summary.range / max_stems))) - 1)
+    unit = 10.0 ** exponent
+    leaves_per_line = 10 // lines_per_stem
+    
+    def line_keys(values):
+        # Integer leaf units, cut towards zero so that -0 and 0 are separate stems
+        units = np.floor(np.round(np.abs(values) / unit, 6)).astype(np.int64)
+        leaves = units % 10
+        line = (units // 10) * lines_per_stem + leaves // leaves_per_line
+        return np.where(values < 0, -line - 1, line), leaves
+    
+    low, _ = line_keys(np.array([summary.minimum]))
+    high, _ = line_keys(np.array([summary.maximum]))
+    n_lines = int(high[0] - low[0]) + 1
+    counts = np.zeros(n_lines * 10, dtype=np.int64)
+    for block in iter_blocks(data):
+        keys, leaves = line_keys(block)
+        counts += np.bincount((keys - low[0]) * 10 + leaves, minlength=n_lines * 10)
+    counts = counts.reshape(n_lines, 10)
+    
+    keys = np.arange(low[0], high[0] + 1)
+    negative = keys < 0
+    magnitude = np.where(negative, -keys - 1, keys)
+    stems = magnitude // lines_per_stem
+    markers = STEM_LINE_MARKERS[lines_per_stem]
+    labels = [
+        ("-" if neg else "") + f"{stem}" + markers[part]
+        for neg, stem, part in zip(negative, stems, magnitude % lines_per_stem)
+    ]
+    width = max(len(label) for label in labels)
     
     # Format the stem and leaf plot
-    stem_leaf_text = "Stem | Leaf\n-----------\n"
-    for stem in sorted(stems.keys()):
-        leaves = stems[stem]
-        leaf_str = ' '.join([str(leaf) for leaf in sorted(leaves)])
-        stem_leaf_text += f"{stem:4} | {leaf_str}\n"
-    
-    stem_leaf_text += "\nKey: "
-    if leaf_factor == 1 and stem_factor == 10:
-        stem_leaf_text += f"{stem}|{leaves[0]} = {stem*stem_factor + leaves[0]}"
+    lines = ["Stem | Leaf", "-----------"]
+    aggregated = False
+    for label, neg, row in zip(labels, negative, counts):
+        # Leaves run from the smallest value up, which is the largest leaf first below zero
+        digits = range(9, -1, -1) if neg else range(10)
+        if row.sum() > max_leaves:
+            aggregated = True
+            leaf_str = " ".join(f"{d}×{row[d]}" for d in digits if row[d])
+        else:
+            leaf_str = "".join(f"{d} " * row[d] for d in digits).rstrip()
+        lines.append(f"{label:>{width}} | {leaf_str}")
+    
+    # Key from the last line that has leaves
+    last = np.flatnonzero(counts.sum(axis=1))[-1]
+    leaf = int(np.flatnonzero(counts[last])[0])
+    value = (stems[last] * 10 + leaf) * unit * (-1 if negative[last] else 1)
+    if exponent > STEM_LEAF_MAX_DECIMALS:
+        # Fixed-point would spell out every zero of a huge unit; scientific keeps the leaf digit last
+        digits = max(int(np.floor(np.log10(abs(value)))) - exponent, 0) if value else 0
+        value_text, unit_text = f"{value:.{digits}e}", f"{unit:g}"
     else:
-        stem_leaf_text += f"{stem}|{leaves[0]} = {(stem*stem_factor + leaves[0])/leaf_factor:.{max_decimals}f}"
-    
-    return stem_leaf_text
+        decimals = max(-exponent, 0)
+        value_text, unit_text = f"{value:.{decimals}f}", f"{unit:.{decimals}f}"
+    lines.append("")
+    lines.append(f"Key: {'-' if negative[last] else ''}{stems[last]}|{leaf} = {value_text}")
+    lines.append(f"Leaf unit: {unit_text}")
+    if aggregated:
+        lines.append(f"d×c: c leaves of d, on lines with more than {max_leaves} leaves")
+    
+    return "\n".join(lines) + "\n"
 
-def plot_normal_probability(data):
+def _thinned_ranks(n, n_points=PROBPLOT_POINTS, n_tail=PROBPLOT_TAIL_POINTS):
+    """0-based ranks evenly spaced in normal-quantile space, plus every rank in the outer tails"""
+    from scipy import stats
+    
+    # Filliben's order statistic medians, as scipy.stats.probplot uses
+    first = stats.norm.ppf(1 - 0.5 ** (1 / n))
+    uniform = stats.norm.cdf(np.linspace(first, -first, n_points))
+    ranks = np.rint(uniform * (n + 0.365) + 0.3175).astype(np.int64) - 1
+    tails = np.concatenate((np.arange(n_tail), np.arange(n - n_tail, n)))
+    return np.unique(np.clip(np.concatenate((ranks, tails)), 0, n - 1))
+
+@timed("plot")
+def plot_normal_probability(data, summary=None):
     """Create a normal probability plot"""
-    fig, ax = plt.subplots(figsize=(10, 6))
+    from scipy import stats
+    
+    if summary is None:
+        summary = describe(data)
+    fig, ax = new_figure(figsize=(10, 6))
     
-    # Create QQ plot
-    stats.probplot(data, plot=ax)
+    if summary.n <= PROBPLOT_POINTS:
+        # Create QQ plot
+        stats.probplot(data, plot=ax)
+    else:
+        # Plot a subset of the order statistics, dense in the tails and sparse in the middle
+        n = summary.n
+        ranks = _thinned_ranks(n)
+        uniform = (ranks + 1 - 0.3175) / (n + 0.365)
+        uniform[ranks == 0] = 1 - 0.5 ** (1 / n)
+        uniform[ranks == n - 1] = 0.5 ** (1 / n)
+        theoretical = stats.norm.ppf(uniform)
+        ordered = summary.values_at(ranks)
+        
+        # Least-squares line of the full plot, with each point weighted by the ranks it stands for
+        weights = np.gradient(ranks.astype(np.float64))
+        slope = np.sum(weights * theoretical * (ordered - summary.mean)) / np.sum(weights * theoretical ** 2)
+        
+        ax.plot(theoretical, ordered, 'bo')
+        ax.plot(theoretical, slope * theoretical + summary.mean, 'r-')
+        ax.set_xlabel('Theoretical quantiles')
+        ax.set_ylabel('Ordered Values')
     
     ax.set_title('Normal Probability Plot', fontsize=14)
     
     # Add a reference line
     x = np.array(ax.get_xlim())
-    y = x * ax.get_lines()[0].get_xydata()[:,1].std() + np.mean(data)
+    y = x * summary.std_dev(is_population=True) + summary.mean
     ax.plot(x, y, 'r--', linewidth=2)
     
     return fig
 
-def plot_compare_distribution(data):
+def _auto_bins(summary):
+    """Bin count of NumPy's 'auto' rule: the narrower of the Freedman-Diaconis and Sturges widths"""
+    if summary.range == 0:
+        return 1
+    sturges = summary.range / (np.log2(summary.n) + 1)
+    fd = 2 * summary.iqr * summary.n ** (-1 / 3)
+    width = min(fd, sturges) if fd > 0 else sturges
+    return int(np.ceil(summary.range / width))
+
+@timed("plot")
+def plot_compare_distribution(data, summary=None):
     """Create a plot comparing the data distribution to a normal distribution"""
-    fig, ax = plt.subplots(figsize=(10, 6))
+    import seaborn as sns
+    from scipy import stats
+    
+    if summary is None:
+        summary = describe(data)
+    fig, ax = new_figure(figsize=(10, 6))
+    
+    # Plot the data distribution from precomputed bin counts
+    counts, edges = summary.histogram(_auto_bins(summary))
+    sns.histplot(x=edges[:-1], weights=counts, bins=edges.tolist(), stat='density', label='Data Distribution', ax=ax)
+    if summary.n > 1 and summary.range > 0:
+        grid, density = binned_kde(summary.values, summary=summary)
+        ax.plot(grid, density, color=ax.patches[0].get_facecolor()[:3])
     
-    # Plot the data distribution
-    sns.histplot(data, kde=True, stat='density', label='Data Distribution', ax=ax)
+    # Mean and standard deviation of the data
+    mean_val = summary.mean
+    std_dev = summary.std_dev(is_population=True)
     
     # Overlay a normal distribution
-    x = np.linspace(min(data) - 1, max(data) + 1, 1000)
-    y = stats.norm.pdf(x, np.mean(data), np.std(data))
+    x = np.linspace(summary.minimum - 1, summary.maximum + 1, 1000)
+    y = stats.norm.pdf(x, mean_val, std_dev)
     ax.plot(x, y, 'r-', linewidth=2, label='Normal Distribution')
     
     # Add mean and standard deviation lines
-    mean_val = np.mean(data)
-    std_dev = np.std(data)
-    
     ax.axvline(mean_val, color='green', linestyle='--', linewidth=2, label=f'Mean: {mean_val:.2f}')
     ax.axvline(mean_val + std_dev, color='blue', linestyle=':', linewidth=2, label=f'Mean + SD: {mean_val + std_dev:.2f}')
     ax.axvline(mean_val - std_dev, color='blue', linestyle=':', linewidth=2, label=f'Mean - SD: {mean_val - std_dev:.2f}')
@@ -216,7 +365,8 @@ def plot_compare_distribution(data):
     
     return fig
 
-def visualization_tab(data):
+@timed("section")
+def visualization_tab(data, summary):
     """Display the visualization tab content"""
     st.header("📈 Visualization")
     st.write("Explore different ways to visualize your data for better insights.")
@@ -246,8 +396,7 @@ def visualization_tab(data):
         if bins != "auto":
             bins = int(bins)
         
-        fig = plot_histogram(data, bins=bins, kde=kde)
-        st.pyplot(fig)
+        show_plot(plot_histogram, data, bins=bins, kde=kde, summary=summary)
         
         st.markdown("""
         ### About Histograms
@@ -270,8 +419,15 @@ def visualization_tab(data):
     elif viz_type == "Box Plot":
         st.subheader("Box Plot")
         
-        fig = plot_boxplot(data)
-        st.pyplot(fig)
+        multiplier = st.radio(
+            "Whiskers reach the:",
+            [INNER_FENCE, OUTER_FENCE],
+            format_func=lambda k: f"Inner fences (k = {k:g})" if k == INNER_FENCE else f"Outer fences (k = {k:g})",
+            horizontal=True,
+            key="boxplot_fences"
+        )
+        
+        show_plot(plot_boxplot, data, multiplier=multiplier, summary=summary)
         
         st.markdown("""
         ### About Box Plots
@@ -281,7 +437,7 @@ def visualization_tab(data):
         **Key components:**
         - **Box**: Represents the interquartile range (IQR), from Q1 (25th percentile) to Q3 (75th percentile)
         - **Line inside box**: Median (50th percentile)
-        - **Whiskers**: Extend to the most extreme data points within 1.5 × IQR from the box
+        - **Whiskers**: Extend to the most extreme data points within k × IQR from the box (k = 1.5 for the inner fences, 3 for the outer fences)
         - **Points beyond whiskers**: Potential outliers
         
         **Advantages of box plots:**
@@ -294,7 +450,14 @@ def visualization_tab(data):
     elif viz_type == "Stem-and-Leaf Plot":
         st.subheader("Stem-and-Leaf Plot")
         
-        stem_leaf_text = plot_stem_and_leaf(data)
+        lines_per_stem = st.radio(
+            "Lines per stem:",
+            [1, 2, 5],
+            horizontal=True,
+            help="Split each stem over 2 lines (leaves 0-4 and 5-9) or 5 lines (two leaf digits each)"
+        )
+        
+        stem_leaf_text = plot_stem_and_leaf(data, lines_per_stem=lines_per_stem, summary=summary)
         st.text(stem_leaf_text)
         
         st.markdown("""
@@ -317,8 +480,7 @@ def visualization_tab(data):
     elif viz_type == "Normal Probability Plot":
         st.subheader("Normal Probability Plot")
         
-        fig = plot_normal_probability(data)
-        st.pyplot(fig)
+        show_plot(plot_normal_probability, data, summary=summary)
         
         st.markdown("""
         ### About Normal Probability Plots
@@ -340,8 +502,7 @@ def visualization_tab(data):
     elif viz_type == "Distribution Comparison":
         st.subheader("Distribution Comparison")
         
-        fig = plot_compare_distribution(data)
-        st.pyplot(fig)
+        show_plot(plot_compare_distribution, data, summary=summary)
         
         st.markdown("""
         ### About Distribution Comparison
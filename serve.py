@@ -0,0 +1,21 @@
+"""Start the app with its metrics endpoint up from the moment the server starts.
+
+Usage: STATS_APP_METRICS_PORT=9464 python serve.py [streamlit run options]
+
+`streamlit run app.py` only executes app.py when a session connects, so the
+endpoint it starts is down after a restart until someone opens the page. This
+launcher starts the endpoint first, then runs Streamlit in the same process,
+where app.py finds it already running.
+"""
+import os
+import sys
+
+from streamlit.web import cli
+
+from modules.metrics import start_metrics_server
+
+if __name__ == "__main__":
+    start_metrics_server()
+    app = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+    sys.argv = ["streamlit", "run", app, *sys.argv[1:]]
+    sys.exit(cli.main())
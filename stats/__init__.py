@@ -0,0 +1,23 @@
+"""Headless statistics API: the numbers the app shows, without Streamlit or plotting.
+
+    >>> import stats
+    >>> result = stats.summarize([2, 4, 4, 5, 7])
+    >>> result.center.modes, result.variability.iqr
+    ((4.0,), 3.0)
+
+Importing the package only defines the result types; NumPy and the statistics
+engine are loaded by the first call, so batch jobs and services can import it
+cheaply.
+"""
+from stats.results import Center, Quantiles, Shape, Summary, Variability
+
+_FUNCTIONS = ("describe", "center", "variability", "quantiles", "shape", "summarize")
+
+__all__ = ["Center", "Quantiles", "Shape", "Summary", "Variability", *_FUNCTIONS]
+
+
+def __getattr__(name):
+    if name in _FUNCTIONS:
+        from stats import core
+        return getattr(core, name)
+    raise AttributeError(f"module 'stats' has no attribute {name!r}")
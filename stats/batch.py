@@ -0,0 +1,172 @@
+"""Summarize many datasets at once, spread across a process pool.
+
+Usage: python -m stats.batch PATH_OR_GLOB [...] -o summary.csv [--workers N] [--population]
+
+Every numeric column of a CSV, Parquet or Arrow file is one dataset, and a .npy
+or raw float64 file is one memory-mapped dataset. A directory stands for the
+supported files directly inside it. The combined report has one row per
+dataset with the statistics of the All Statistics tab; it is written as CSV or
+Parquet according to the output extension. Throughput is reported on stderr.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from modules.file_input import FILE_FORMATS, detect_format, list_numeric_columns, load_column, open_binary_dataset
+from modules.stats_engine import format_value
+from stats.core import summarize
+
+# Files a directory argument expands to; a glob or explicit path may name raw float64 files with any extension
+BINARY_EXTENSIONS = (".npy", ".bin", ".f64")
+
+# Work items handed to a worker at a time, per worker; larger chunks cut the inter-process overhead of tiny files
+CHUNKS_PER_WORKER = 8
+
+
+def expand_inputs(inputs):
+    """Sorted, de-duplicated file paths named by directories, globs and plain paths"""
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for entry in os.scandir(item):
+                extension = os.path.splitext(entry.name)[1].lower()
+                if entry.is_file() and (extension in FILE_FORMATS or extension in BINARY_EXTENSIONS):
+                    paths.add(entry.path)
+        elif glob.has_magic(item):
+            paths.update(path for path in glob.glob(item, recursive=True) if os.path.isfile(path))
+        elif os.path.isfile(item):
+            paths.add(item)
+        else:
+            raise FileNotFoundError(f"No such file or directory: '{item}'")
+    return sorted(paths)
+
+
+def summary_row(result):
+    """One report row: the statistics of create_summary_dataframe, keyed by their labels"""
+    center, variability, quantiles, shape = result.center, result.variability, result.quantiles, result.shape
+    mode = ", ".join(format_value(x) for x in center.modes) if center.modes else "No mode"
+    return {
+        "Count": result.n,
+        "Minimum": result.minimum,
+        "Maximum": result.maximum,
+        "Range": variability.range,
+        "Mean": center.mean,
+        "Median": center.median,
+        "Mode": mode,
+        "Mode Exact": center.mode_exact,
+        "Variance": variability.variance,
+        "Standard Deviation": variability.std_dev,
+        "CV": variability.cv,
+        "10th Percentile": quantiles.p10,
+        "25th Percentile (Q1)": quantiles.q1,
+        "50th Percentile (Median)": quantiles.median,
+        "75th Percentile (Q3)": quantiles.q3,
+        "90th Percentile": quantiles.p90,
+        "IQR (Q3-Q1)": variability.iqr,
+        "Exact Quantiles": quantiles.exact,
+        "Skewness": shape.skewness,
+        "Kurtosis": shape.kurtosis,
+    }
+
+
+def _summarize_values(path, column, values, is_population, n_dropped=0):
+    row = {"File": path, "Column": column, "Dropped": n_dropped}
+    row.update(summary_row(summarize(values, is_population)))
+    return row
+
+
+def summarize_file(path, is_population=False):
+    """Report rows for every dataset in one file; a dataset that fails gets a row with its error"""
+    extension = os.path.splitext(path)[1].lower()
+    try:
+        if extension not in FILE_FORMATS:
+            return [_summarize_values(path, None, open_binary_dataset(path), is_population)]
+        fmt = detect_format(path)
+        with open(path, "rb") as file:
+            columns = list_numeric_columns(file, fmt)
+            if not columns:
+                raise ValueError("no numeric columns")
+            rows = []
+            for column in columns:
+                try:
+                    values, n_dropped = load_column(file, fmt, column)
+                    rows.append(_summarize_values(path, column, values, is_population, n_dropped))
+                except (OSError, ValueError) as e:
+                    rows.append({"File": path, "Column": column, "Error": str(e)})
+            return rows
+    except (OSError, ValueError) as e:
+        return [{"File": path, "Column": None, "Error": str(e)}]
+
+
+def _summarize_chunk(paths, is_population):
+    return [row for path in paths for row in summarize_file(path, is_population)]
+
+
+def run_batch(paths, workers=None, is_population=False):
+    """Report rows for every file, in input order, computed by a pool of worker processes"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return _summarize_chunk(paths, is_population)
+    size = max(1, len(paths) // (workers * CHUNKS_PER_WORKER))
+    chunks = [paths[i:i + size] for i in range(0, len(paths), size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(_summarize_chunk, chunks, [is_population] * len(chunks))
+        return [row for rows in results for row in rows]
+
+
+def write_report(rows, output):
+    """Write the rows as CSV, or Parquet when the output ends in .parquet or .pq"""
+    import pandas as pd
+
+    report = pd.DataFrame(rows)
+    if "Error" not in report:
+        report["Error"] = None
+    if os.path.splitext(output)[1].lower() in (".parquet", ".pq"):
+        report.to_parquet(output, index=False)
+    else:
+        report.to_csv(output, index=False)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("inputs", nargs="+", help="directories, glob patterns or files")
+    parser.add_argument("-o", "--output", default="summary.csv", help="report path, .csv or .parquet")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--population", action="store_true", help="treat every dataset as a population")
+    args = parser.parse_args(argv)
+
+    try:
+        paths = expand_inputs(args.inputs)
+    except FileNotFoundError as e:
+        parser.error(str(e))
+    if not paths:
+        parser.error("no files matched")
+
+    workers = args.workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    rows = run_batch(paths, workers, args.population)
+    elapsed = time.perf_counter() - start
+    report = write_report(rows, args.output)
+
+    failed = report["Error"].notna()
+    n_datasets = int((~failed).sum())
+    n_values = int(report.loc[~failed, "Count"].sum()) if n_datasets else 0
+    print(
+        f"Summarized {n_datasets:,} datasets ({n_values:,} values) from {len(paths):,} files "
+        f"in {elapsed:.2f} s with {workers} worker{'s' if workers != 1 else ''}: "
+        f"{n_datasets / elapsed:,.1f} datasets/s, {n_values / elapsed:,.0f} values/s",
+        file=sys.stderr,
+    )
+    for _, row in report[failed].iterrows():
+        column = f" [{row['Column']}]" if isinstance(row["Column"], str) else ""
+        print(f"Failed: {row['File']}{column}: {row['Error']}", file=sys.stderr)
+    print(f"Report written to {args.output}", file=sys.stderr)
+    return 1 if failed.any() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
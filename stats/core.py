@@ -0,0 +1,87 @@
+from inspect import unwrap
+
+from modules.stats_engine import describe as _cached_describe, heavy_hitter_modes, mode_type
+from stats.results import Center, Quantiles, Shape, Summary, Variability
+
+# The app's describe() keeps results in a process-wide cache for its sessions;
+# batch jobs see each dataset once, so they skip it rather than fill it
+_describe = unwrap(_cached_describe)
+
+
+def describe(data):
+    """Engine summary of a sequence, array or memory-mapped array, for reuse across calls"""
+    return _describe(data)
+
+
+def center(data, summary=None):
+    """Mean, median and mode; memory-mapped data get the heavy-hitter mode estimate"""
+    if summary is None:
+        summary = describe(data)
+    if summary.out_of_core:
+        modes, mode_count, exact = heavy_hitter_modes(summary.heavy_hitters)
+        modes = tuple(modes)
+    else:
+        modes, mode_count, exact = tuple(summary.mode_values), summary.max_count, True
+    return Center(
+        n=summary.n,
+        mean=summary.mean,
+        median=summary.median,
+        modes=modes,
+        mode_count=mode_count,
+        mode_type=mode_type(len(modes)),
+        mode_exact=exact,
+    )
+
+
+def variability(data, is_population=False, summary=None):
+    """Range, variance, standard deviation, quartiles, IQR and coefficient of variation"""
+    if summary is None:
+        summary = describe(data)
+    return Variability(
+        n=summary.n,
+        is_population=is_population,
+        range=summary.range,
+        variance=summary.variance(is_population),
+        std_dev=summary.std_dev(is_population),
+        q1=summary.q1,
+        q3=summary.q3,
+        iqr=summary.iqr,
+        cv=summary.cv,
+    )
+
+
+def quantiles(data, summary=None):
+    """10th, 25th, 50th, 75th and 90th percentiles"""
+    if summary is None:
+        summary = describe(data)
+    return Quantiles(
+        p10=summary.p10,
+        q1=summary.q1,
+        median=summary.median,
+        q3=summary.q3,
+        p90=summary.p90,
+        exact=summary.exact_quantiles,
+        rank_error=summary.sketch.rank_error if summary.sketch is not None else None,
+    )
+
+
+def shape(data, summary=None):
+    """Skewness and kurtosis"""
+    if summary is None:
+        summary = describe(data)
+    return Shape(skewness=summary.skewness, kurtosis=summary.kurtosis)
+
+
+def summarize(data, is_population=False, summary=None):
+    """Every result of the All Statistics tab, from one pass over the data"""
+    if summary is None:
+        summary = describe(data)
+    return Summary(
+        n=summary.n,
+        minimum=summary.minimum,
+        maximum=summary.maximum,
+        center=center(data, summary),
+        variability=variability(data, is_population, summary),
+        quantiles=quantiles(data, summary),
+        shape=shape(data, summary),
+    )
@@ -0,0 +1,62 @@
+from dataclasses import asdict, dataclass
+
+
+@dataclass(frozen=True)
+class Center:
+    """Mean, median and mode of a dataset"""
+    n: int
+    mean: float
+    median: float
+    modes: tuple  # Most frequent values, empty when no value repeats
+    mode_count: int  # Occurrences of each mode (a lower bound when not mode_exact)
+    mode_type: str  # "No mode", "Unimodal", "Bimodal" or "Multimodal"
+    mode_exact: bool = True  # False when a heavy-hitter estimate cannot rule out another mode
+
+
+@dataclass(frozen=True)
+class Variability:
+    """Spread of a dataset; variance, standard deviation and CV follow is_population"""
+    n: int
+    is_population: bool
+    range: float
+    variance: float
+    std_dev: float
+    q1: float
+    q3: float
+    iqr: float
+    cv: float  # Percent, from the sample standard deviation as in the app
+
+
+@dataclass(frozen=True)
+class Quantiles:
+    """Percentiles by the (n+1)p rule, or KLL sketch estimates when not exact"""
+    p10: float
+    q1: float
+    median: float
+    q3: float
+    p90: float
+    exact: bool = True
+    rank_error: float = None  # Sketch rank error bound, when a sketch was built
+
+
+@dataclass(frozen=True)
+class Shape:
+    """Adjusted skewness and excess kurtosis, matching pandas"""
+    skewness: float
+    kurtosis: float
+
+
+@dataclass(frozen=True)
+class Summary:
+    """Everything the All Statistics tab reports about a dataset"""
+    n: int
+    minimum: float
+    maximum: float
+    center: Center
+    variability: Variability
+    quantiles: Quantiles
+    shape: Shape
+
+    def to_dict(self):
+        """Nested plain-Python dictionary of every result"""
+        return asdict(self)
@@ -0,0 +1,100 @@
+"""Import-time budget: check what the app and the headless API import at startup, and how long it takes.
+
+Usage: python tools/import_budget.py [--repeat 3] [--top 10] [--scale 1.0]
+
+Each target runs in a fresh interpreter under `python -X importtime`, leaving
+out what an empty interpreter already imports (site and its .pth hooks). A
+target fails if it imports a module on its deferred list (those belong to
+first use, not to startup) or if its total import time, the best of --repeat
+runs, is over budget. --scale multiplies every budget, for slower machines.
+Exits with status 1 if any target fails.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules imported on first use by a plot or a section, never at startup
+PLOTTING = ("matplotlib", "seaborn", "scipy")
+
+# name -> (interpreter arguments, deferred top-level packages, budget in ms or None)
+TARGETS = {
+    # Running the script bare executes it up to the first paint (no data entered yet);
+    # pandas waits for a CSV upload or the Performance panel
+    "app cold start": (["app.py"], ("pandas",) + PLOTTING, 1200),
+    "section modules": (
+        ["-c", "import modules.measures_center, modules.measures_variability, modules.visualization, modules.all_stats"],
+        PLOTTING,
+        None,
+    ),
+    "headless stats": (["-c", "import stats"], ("numpy", "pandas", "streamlit") + PLOTTING, 80),
+}
+
+
+def import_times(args):
+    """(self µs, cumulative µs, module, depth) of every import made by a fresh interpreter"""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        times.append((int(self_us), int(cumulative_us), name.strip(), depth))
+    if result.returncode:
+        raise RuntimeError(f"{' '.join(args)} exited with status {result.returncode}:\n{result.stderr[-2000:]}")
+    return times
+
+
+def check(name, args, deferred, budget_ms, repeat, top, scale, startup):
+    runs = [[t for t in import_times(args) if t[2] not in startup] for _ in range(repeat)]
+    times = min(runs, key=lambda run: sum(t[0] for t in run))
+    total_ms = sum(t[0] for t in times) / 1000
+    imported = {module for _, _, module, _ in times}
+    leaked = sorted(package for package in deferred if package in imported)
+
+    budget = budget_ms * scale if budget_ms is not None else None
+    over = budget is not None and total_ms > budget
+    status = "FAIL" if leaked or over else "ok"
+    limit = f" / {budget:.0f} ms budget" if budget is not None else ""
+    print(f"[{status}] {name}: {total_ms:.1f} ms{limit}")
+    if leaked:
+        print(f"    imported at startup: {', '.join(leaked)}")
+        # Show the chain that pulled in each leaked package
+        for package in leaked:
+            index = next(i for i, t in enumerate(times) if t[2] == package)
+            chain, depth = [package], times[index][3]
+            for _, _, module, module_depth in times[index + 1:]:
+                if module_depth < depth:
+                    chain.append(module)
+                    depth = module_depth
+            print(f"      {' <- '.join(chain)}")
+    # Slowest top-level imports of the target, by cumulative time
+    for _, cumulative_us, module, _ in sorted((t for t in times if t[3] == 0), reverse=True, key=lambda t: t[1])[:top]:
+        print(f"    {cumulative_us / 1000:8.1f} ms  {module}")
+    return status == "ok"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="runs per target; the fastest counts")
+    parser.add_argument("--top", type=int, default=10, help="slowest top-level imports listed per target")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier applied to every budget")
+    args = parser.parse_args(argv)
+
+    startup = {module for _, _, module, _ in import_times(["-c", "pass"])}
+    results = [
+        check(name, target_args, deferred, budget_ms, args.repeat, args.top, args.scale, startup)
+        for name, (target_args, deferred, budget_ms) in TARGETS.items()
+    ]
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""Scraper stub: fetch the app's Prometheus endpoint, check the exposition format and print what it reports.
+
+Usage: python tools/scrape_metrics.py [--url http://127.0.0.1:9464/metrics]
+       python tools/scrape_metrics.py --drive [--port 9464]
+
+With --url it scrapes a running app (started with STATS_APP_METRICS_PORT set).
+With --drive it runs the app in this process with Streamlit's test harness,
+loads a sample dataset, visits every section and then scrapes, so the endpoint
+can be checked without a browser. Every line must parse, histogram buckets
+must be cumulative and end in +Inf equal to _count, and every family the app
+exports must be present. Exits with status 1 on any problem.
+"""
+import argparse
+import os
+import re
+import sys
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Families the app exports, with their types
+EXPECTED = {
+    "stats_app_reruns_total": "counter",
+    "stats_app_rerun_duration_seconds": "histogram",
+    "stats_app_dataset_values": "histogram",
+    "stats_app_figure_render_seconds": "histogram",
+    "stats_app_sessions_in_flight": "gauge",
+    "stats_app_cache_requests_total": "counter",
+    "stats_app_cache_hit_ratio": "gauge",
+    "stats_app_cache_bytes": "gauge",
+}
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{(.*)\})? (\S+)$')
+LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"(,|$)')
+
+
+def parse(text):
+    """{family: (type, [(sample name, labels dict, value)])} and the problems found"""
+    families, problems = {}, []
+    for number, line in enumerate(text.splitlines(), 1):
+        if not line:
+            continue
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ", 3)
+            families.setdefault(name, (kind, []))
+            continue
+        if line.startswith("#"):
+            continue
+        match = SAMPLE.match(line)
+        if not match:
+            problems.append(f"line {number}: not a sample: {line!r}")
+            continue
+        name, _, label_text, value = match.groups()
+        labels = dict((key, value) for key, value, _ in LABEL.findall(label_text or ""))
+        try:
+            value = float(value)
+        except ValueError:
+            problems.append(f"line {number}: bad value {value!r}")
+            continue
+        family = re.sub(r"_(bucket|sum|count)$", "", name) if name not in families else name
+        if family not in families:
+            problems.append(f"line {number}: sample {name} has no # TYPE line")
+            continue
+        families[family][1].append((name, labels, value))
+    return families, problems
+
+
+def check_histogram(name, samples):
+    """Problems with the buckets of each label set of a histogram"""
+    problems = []
+    series = {}
+    for sample, labels, value in samples:
+        key = tuple(sorted((k, v) for k, v in labels.items() if k != "le"))
+        entry = series.setdefault(key, {"buckets": [], "count": None})
+        if sample.endswith("_bucket"):
+            entry["buckets"].append((float(labels["le"]), value))
+        elif sample.endswith("_count"):
+            entry["count"] = value
+    for key, entry in series.items():
+        counts = [count for _, count in entry["buckets"]]
+        if counts != sorted(counts):
+            problems.append(f"{name}{dict(key)}: buckets are not cumulative")
+        if not entry["buckets"] or entry["buckets"][-1][0] != float("inf"):
+            problems.append(f"{name}{dict(key)}: no +Inf bucket")
+        elif entry["buckets"][-1][1] != entry["count"]:
+            problems.append(f"{name}{dict(key)}: +Inf bucket differs from _count")
+    return problems
+
+
+def scrape(url):
+    with urllib.request.urlopen(url, timeout=10) as response:
+        content_type = response.headers.get("Content-Type", "")
+        return response.read().decode(), content_type
+
+
+def drive_app(port):
+    """Run the app headless with the endpoint on port, through every section of a sample dataset"""
+    os.environ["STATS_APP_METRICS_PORT"] = str(port)
+    sys.path.insert(0, ROOT)
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=600)
+    app.run()
+    app.sidebar.radio[0].set_value("Sample Datasets").run()
+    for section in app.main.radio[0].options:
+        app.main.radio[0].set_value(section).run()
+        if app.exception:
+            raise SystemExit(f"{section}: {app.exception}")
+    # Revisit one section, so the shared caches see hits
+    app.main.radio[0].set_value(app.main.radio[0].options[2]).run()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="endpoint to scrape (default: the --port on this machine)")
+    parser.add_argument("--port", type=int, default=9464)
+    parser.add_argument("--drive", action="store_true", help="run the app in this process before scraping")
+    args = parser.parse_args(argv)
+
+    if args.drive:
+        drive_app(args.port)
+    url = args.url or f"http://127.0.0.1:{args.port}/metrics"
+    text, content_type = scrape(url)
+    families, problems = parse(text)
+
+    if not content_type.startswith("text/plain"):
+        problems.append(f"Content-Type is {content_type!r}, not text/plain")
+    for name, kind in EXPECTED.items():
+        if name not in families:
+            problems.append(f"{name}: missing")
+        elif families[name][0] != kind:
+            problems.append(f"{name}: type {families[name][0]}, expected {kind}")
+    for name, (kind, samples) in families.items():
+        if kind == "histogram":
+            problems.extend(check_histogram(name, samples))
+
+    print(f"Scraped {url}: {len(families)} families, {sum(len(s) for _, s in families.values())} samples")
+    for name, (kind, samples) in sorted(families.items()):
+        print(f"  {name} ({kind})")
+        for sample, labels, value in samples:
+            if kind == "histogram" and not sample.endswith("_count"):
+                continue
+            label_text = ", ".join(f"{k}={v}" for k, v in labels.items())
+            print(f"    {sample.removeprefix(name) or 'value'}{f' [{label_text}]' if label_text else ''}: {value:g}")
+
+    if problems:
+        print(f"\n{len(problems)} problem(s):")
+        for problem in problems:
+            print(f"  {problem}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Soak test for figure lifecycle: rerun the app many times and check resident memory stays flat.
+
+Usage: python tools/soak_figures.py [--reruns 10000] [--warmup 200] [--tolerance-mb 50]
+
+Each rerun redraws the views that build figures (frequency chart, empirical-rule
+plot, five-number summary, histogram). Exits with status 1 if resident memory
+grows by more than the tolerance after the warm-up reruns.
+"""
+import argparse
+import os
+import sys
+
+from streamlit.testing.v1 import AppTest
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+# (section, measure) pairs drawn in turn; None leaves the section's default view
+VIEWS = [
+    ("📏 Measures of Center", "Mode"),
+    ("📊 Measures of Variability", "Standard Deviation"),
+    ("🧮 All Statistics", None),
+    ("📈 Visualization", "Histogram"),
+]
+
+
+def resident_mb():
+    """Current resident set size in MB (Linux /proc, falling back to the peak from getrusage)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def rerun(at, i):
+    section, measure = VIEWS[i % len(VIEWS)]
+    at.main.radio(key="active_section").set_value(section).run()
+    if measure is not None:
+        at.main.radio[1].set_value(measure).run()
+    if at.exception:
+        raise RuntimeError(at.exception)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=10_000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--tolerance-mb", type=float, default=50.0)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(APP))
+    at = AppTest.from_file(APP, default_timeout=600)
+    at.run()
+    at.sidebar.radio[0].set_value("Sample Datasets").run()
+
+    for i in range(args.warmup):
+        rerun(at, i)
+    baseline = resident_mb()
+    print(f"after {args.warmup} warm-up reruns: {baseline:.1f} MB")
+
+    step = max(args.reruns // 10, 1)
+    for i in range(args.reruns):
+        rerun(at, i)
+        if (i + 1) % step == 0:
+            print(f"rerun {i + 1:>6}: {resident_mb():.1f} MB")
+
+    import matplotlib.pyplot as plt
+
+    growth = resident_mb() - baseline
+    print(f"growth {growth:+.1f} MB, open pyplot figures: {len(plt.get_fignums())}")
+    if growth > args.tolerance_mb:
+        print(f"FAIL: resident memory grew by more than {args.tolerance_mb} MB")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())